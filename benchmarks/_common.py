@@ -0,0 +1,38 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The benchmarks import nodes.py directly, which needs ComfyUI's own modules
+(folder_paths, comfy.utils). Point --comfyui-dir (or the COMFYUI_DIR
+environment variable) at a ComfyUI checkout to make them importable.
+"""
+
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def add_comfyui_argument(parser):
+    parser.add_argument("--comfyui-dir", default=os.environ.get("COMFYUI_DIR", ""),
+                        help="Path to a ComfyUI checkout (defaults to $COMFYUI_DIR)")
+
+
+def import_nodes(comfyui_dir):
+    """Import this repository's nodes module with ComfyUI on sys.path."""
+    if comfyui_dir:
+        sys.path.insert(0, os.path.abspath(comfyui_dir))
+    sys.path.insert(0, REPO_DIR)
+    try:
+        import nodes
+    except ImportError as e:
+        raise SystemExit(f"Could not import nodes.py ({e}). Pass --comfyui-dir or set COMFYUI_DIR.")
+    return nodes
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
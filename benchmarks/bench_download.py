@@ -0,0 +1,99 @@
+"""
+Benchmark model download memory against the local mock API.
+
+Serves a synthetic GLB of each requested size from an in-process mock_server
+and downloads it with download_file in a fresh subprocess, so that every size
+gets its own peak RSS (which never decreases within a process) and the
+mock's copy of the file is not counted. Peak RSS should stay flat as the model
+grows, since downloads are streamed to disk in DOWNLOAD_CHUNK_SIZE chunks.
+
+Usage:
+    python benchmarks/bench_download.py --comfyui-dir /path/to/ComfyUI --sizes 10 100 500
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import add_comfyui_argument, import_nodes
+from mock_server import MockConfig, MockServer
+
+SIZES_MB = [10, 100, 500]
+
+
+def peak_rss_mb():
+    """Peak resident set size of the process so far (never decreases)."""
+    # On Linux ru_maxrss survives fork and exec, so a child would report the
+    # parent's peak (which includes the mock's copy of the file); VmHWM does not
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def download_once(args):
+    """Child process: download args.url once and print the measurements as JSON."""
+    nodes = import_nodes(args.comfyui_dir)
+
+    # Keep the downloaded model out of the ComfyUI output directory
+    import folder_paths
+    with tempfile.TemporaryDirectory() as output_dir:
+        if hasattr(folder_paths, "set_output_directory"):
+            folder_paths.set_output_directory(output_dir)
+        pipeline = nodes.GenerationPipeline(nodes.API_URL)
+
+        baseline = peak_rss_mb()
+        start = time.perf_counter()
+        path = pipeline.download_file(args.url, "bench_download.glb")
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(path)
+
+    print(json.dumps({"bytes": size, "seconds": seconds, "baseline_rss_mb": baseline, "peak_rss_mb": peak_rss_mb()}))
+
+
+def measure(args, size_mb):
+    config = MockConfig(glb_size=int(size_mb * 1024 * 1024))
+    with MockServer(config) as server:
+        command = [sys.executable, os.path.abspath(__file__), "--url", f"{server.url}files/bench.glb"]
+        if args.comfyui_dir:
+            command += ["--comfyui-dir", args.comfyui_dir]
+        child = subprocess.run(command, capture_output=True, text=True)
+    if child.returncode != 0:
+        raise SystemExit(f"Download of {size_mb} MB failed:\n{child.stderr}")
+    # The last line is the JSON report; the nodes may log before it
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_comfyui_argument(parser)
+    parser.add_argument("--sizes", type=float, nargs="+", default=SIZES_MB, help="GLB sizes to download, in MB")
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.url:
+        download_once(args)
+        return
+
+    print(f"{'size MB':>8} {'seconds':>8} {'MB/s':>8} {'baseline RSS MB':>16} {'peak RSS MB':>12} {'growth MB':>10}")
+    for size_mb in args.sizes:
+        r = measure(args, size_mb)
+        megabytes = r["bytes"] / (1024 * 1024)
+        print(f"{megabytes:>8.0f} {r['seconds']:>8.2f} {megabytes / r['seconds']:>8.1f} "
+              f"{r['baseline_rss_mb']:>16.0f} {r['peak_rss_mb']:>12.0f} "
+              f"{r['peak_rss_mb'] - r['baseline_rss_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark the image upload encoder across common input resolutions.
+
+Reports encode throughput (megapixels per second) and payload size for each
+supported format, and, when torch is installed, the float -> uint8 tensor
+conversion against the previous multiply-and-cast implementation.
+
+Usage:
+    python benchmarks/bench_encode.py --comfyui-dir /path/to/ComfyUI
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from _common import add_comfyui_argument, import_nodes
+
+RESOLUTIONS = [512, 1024, 2048, 4096]
+ENCODINGS = [
+    ("png", 1),
+    ("png", 6),
+    ("png", 9),
+    ("webp", 6),
+    ("jpeg", 6),
+]
+
+
+def synthetic_image(size, seed=0):
+    """A photo-like test image: smooth gradients plus mild sensor noise."""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    image = np.stack([x, y, (x + y) / 2], axis=-1)
+    image += rng.normal(0, 0.02, image.shape).astype(np.float32)
+    return np.clip(image, 0, 1)
+
+
+def time_call(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_conversion(nodes, repeat):
+    try:
+        import torch
+    except ImportError:
+        print("torch not installed, skipping tensor conversion benchmark\n")
+        return
+
+    print(f"{'size':>6} {'legacy ms':>10} {'fused ms':>10}")
+    for size in RESOLUTIONS:
+        tensor = torch.from_numpy(synthetic_image(size))
+        legacy = time_call(lambda: (tensor.cpu().numpy() * 255).astype(np.uint8), repeat)
+        fused = time_call(lambda: nodes.image_to_array(tensor), repeat)
+        print(f"{size:>6} {legacy * 1000:>10.1f} {fused * 1000:>10.1f}")
+    print()
+
+
+def bench_encoders(nodes, repeat):
+    print(f"{'size':>6} {'format':>8} {'level':>5} {'ms':>9} {'MP/s':>8} {'payload KB':>11}")
+    for size in RESOLUTIONS:
+        img_np = (synthetic_image(size) * 255 + 0.5).astype(np.uint8)
+        megapixels = size * size / 1e6
+        for image_format, level in ENCODINGS:
+            seconds = time_call(lambda: nodes.encode_image(img_np, image_format, level), repeat)
+            _, stats = nodes.encode_image(img_np, image_format, level)
+            level_text = str(level) if image_format == "png" else "-"
+            print(f"{size:>6} {image_format:>8} {level_text:>5} {seconds * 1000:>9.1f} "
+                  f"{megapixels / seconds:>8.1f} {stats['payload_bytes'] / 1024:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_comfyui_argument(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+
+    nodes = import_nodes(args.comfyui_dir)
+    bench_conversion(nodes, args.repeat)
+    bench_encoders(nodes, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark end-to-end generation throughput against the local mock API.
+
+Drives the generation node classes directly (submit, poll, download) against
+an in-process mock_server at several concurrency levels and reports
+tasks/minute, p50/p95/p99 end-to-end latency, HTTP requests and polls per
+task, peak memory and the number of threads used. It also reports how long
+after a task completes on the mock server the nodes notice (completion
+detection latency). --fixed-polling swaps the adaptive poll policy for the
+legacy fixed interval, for comparing polls per task and detection latency.
+
+The client-side submit, poll and in-flight limits are lifted unless
+--respect-limits is given (or the BESPOKEAI_* variables are set explicitly),
+so the numbers measure the nodes rather than the configured quotas.
+
+Usage:
+    python benchmarks/bench_throughput.py --comfyui-dir /path/to/ComfyUI
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import add_comfyui_argument, import_nodes, percentile
+from mock_server import MockServer, add_config_arguments, config_from_args
+
+CONCURRENCY_LEVELS = [1, 8, 32, 128]
+UNLIMITED = {
+    "BESPOKEAI_MAX_IN_FLIGHT": "0",
+    "BESPOKEAI_SUBMIT_RATE": "0",
+    "BESPOKEAI_POLL_RATE": "0",
+}
+
+
+class FixedPollPolicy:
+    """The pre-adaptive behaviour: poll every poll_interval seconds."""
+
+    def next_delay(self, task):
+        return max(task.poll_interval, task.retry_after or 0)
+
+
+class ThreadSampler:
+    """Records the peak number of live threads while running."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# Task ID -> time.monotonic() at which a node saw the task complete
+detected = {}
+
+
+def record_detection(stage, seconds, job):
+    if stage == "poll" and job.task_id:
+        detected[job.task_id] = time.monotonic()
+
+
+def peak_rss_mb():
+    """Peak resident set size of the process so far (never decreases)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_one(node, url, args):
+    start = time.perf_counter()
+    node.generate_3d(url, "bench-key", args.resolution, False, False, poll_interval=args.poll_interval)
+    return time.perf_counter() - start
+
+
+def run_level(nodes, server, concurrency, args):
+    tasks = concurrency * args.rounds
+    node = nodes.BespokeAI3DGenerationFromURL()
+    # Unique URLs so that neither the result cache nor single-flight merges tasks
+    urls = [f"https://bench.invalid/{concurrency}/{i}.png" for i in range(tasks)]
+    latencies, errors = [], 0
+
+    server.reset_stats()
+    detected.clear()
+    tracemalloc.reset_peak()
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    start = time.perf_counter()
+    with output, ThreadSampler() as threads, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_one, node, url, args) for url in urls]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                errors += 1
+                if args.verbose:
+                    print(f"generation failed: {e}", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+
+    stats = server.stats()
+    requests = stats["submit"] + stats["poll"] + stats["download"]
+    # Both clocks are time.monotonic() of this process
+    completions = server.completion_times()
+    detection = [seen - completions[task_id] for task_id, seen in detected.items() if task_id in completions]
+    return {
+        "concurrency": concurrency,
+        "tasks": tasks,
+        "errors": errors,
+        "tasks_per_min": len(latencies) / elapsed * 60,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "requests_per_task": requests / tasks,
+        "polls_per_task": stats["poll"] / tasks,
+        "detect_p50": percentile(detection, 50),
+        "detect_p95": percentile(detection, 95),
+        "heap_mb": tracemalloc.get_traced_memory()[1] / (1024 * 1024),
+        "rss_mb": peak_rss_mb(),
+        "threads": threads.peak,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_comfyui_argument(parser)
+    add_config_arguments(parser)
+    parser.add_argument("--levels", type=int, nargs="+", default=CONCURRENCY_LEVELS,
+                        help="Concurrency levels to measure")
+    parser.add_argument("--rounds", type=int, default=2, help="Tasks per level, as a multiple of the concurrency")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="poll_interval input of the node")
+    parser.add_argument("--resolution", default="500k", help="resolution input of the node")
+    parser.add_argument("--fixed-polling", action="store_true", help="Poll at a fixed interval instead of adaptively")
+    parser.add_argument("--respect-limits", action="store_true",
+                        help="Keep the default submit, poll and in-flight limits")
+    parser.add_argument("--verbose", action="store_true", help="Show the nodes' log output")
+    parser.set_defaults(duration=10.0)
+    args = parser.parse_args()
+
+    with MockServer(config_from_args(args)) as server, tempfile.TemporaryDirectory() as output_dir:
+        os.environ["BESPOKEAI_API_URL"] = server.url
+        if not args.respect_limits:
+            for name, value in UNLIMITED.items():
+                os.environ.setdefault(name, value)
+        nodes = import_nodes(args.comfyui_dir)
+
+        # Keep generated models out of the ComfyUI output directory
+        import folder_paths
+        if hasattr(folder_paths, "set_output_directory"):
+            folder_paths.set_output_directory(output_dir)
+        if args.fixed_polling:
+            nodes.get_task_poller().policy = FixedPollPolicy()
+        nodes.add_stage_hook(record_detection)
+
+        print(f"mock API at {server.url}, task duration {args.duration:.0f}s, "
+              f"{'fixed' if args.fixed_polling else 'adaptive'} polling\n")
+        print(f"{'conc':>5} {'tasks':>6} {'err':>4} {'tasks/min':>10} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+              f"{'req/task':>9} {'polls/task':>11} {'detect p50':>11} {'detect p95':>11} "
+              f"{'heap MB':>8} {'rss MB':>7} {'threads':>8}")
+        tracemalloc.start()
+        for concurrency in args.levels:
+            r = run_level(nodes, server, concurrency, args)
+            print(f"{r['concurrency']:>5} {r['tasks']:>6} {r['errors']:>4} {r['tasks_per_min']:>10.1f} "
+                  f"{r['p50']:>7.2f} {r['p95']:>7.2f} {r['p99']:>7.2f} {r['requests_per_task']:>9.1f} "
+                  f"{r['polls_per_task']:>11.1f} {r['detect_p50']:>11.2f} {r['detect_p95']:>11.2f} "
+                  f"{r['heap_mb']:>8.1f} {r['rss_mb']:>7.0f} {r['threads']:>8}")
+        tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Local stand-in for the BespokeAI 3D API, for load and latency testing without spending credits.
+
+Implements the submit (POST), poll (GET ?taskId=) and file download endpoints
+with a configurable progress curve, failure, 429 and 5xx rates, added latency
+and synthetic GLB files of a configurable size. Only the standard library is
+used. Point the nodes at it with the BESPOKEAI_API_URL environment variable:
+
+    python benchmarks/mock_server.py --port 8765 --duration 20
+    BESPOKEAI_API_URL=http://127.0.0.1:8765/ python main.py   # in the ComfyUI checkout
+
+GET /stats returns request counters as JSON and POST /stats/reset clears them.
+Benchmarks can also run the server in process with MockServer.
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# Progress (0-100) as a function of the elapsed fraction (0-1) of a task's duration
+PROGRESS_CURVES = {
+    "linear": lambda x: x,
+    # Slow start and end, like real generations spending time in queue and post-processing
+    "ease": lambda x: (1 - math.cos(math.pi * x)) / 2,
+    # No progress reported until the task completes
+    "none": lambda x: 0.0,
+}
+
+
+def synthetic_glb(size):
+    """
+    Return a valid binary glTF of roughly `size` bytes: one triangle-list mesh
+    whose POSITION accessor spans the whole binary chunk.
+    """
+    vertex_count = max(3, (size - 512) // 12 // 3 * 3)
+    bin_length = vertex_count * 12
+    document = {
+        "asset": {"version": "2.0", "generator": "bespokeai-mock"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0}}]}],
+        "accessors": [{"bufferView": 0, "componentType": 5126, "count": vertex_count, "type": "VEC3",
+                       "min": [0.0, 0.0, 0.0], "max": [0.0, 0.0, 0.0]}],
+        "bufferViews": [{"buffer": 0, "byteLength": bin_length}],
+        "buffers": [{"byteLength": bin_length}],
+    }
+    json_chunk = json.dumps(document, separators=(",", ":")).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+
+    total = 12 + 8 + len(json_chunk) + 8 + bin_length
+    return b"".join([
+        struct.pack("<4sII", b"glTF", 2, total),
+        struct.pack("<I4s", len(json_chunk), b"JSON"), json_chunk,
+        struct.pack("<I4s", bin_length, b"BIN\0"), bytes(bin_length),
+    ])
+
+
+class MockConfig:
+    """Behaviour of the mock API. Rates are probabilities per request (or per task for failures)."""
+
+    def __init__(self, duration=10.0, duration_jitter=0.0, curve="ease", latency=0.0, failure_rate=0.0,
+                 rate_limit_rate=0.0, error_rate=0.0, retry_after=1.0, glb_size=2 * 1024 * 1024,
+                 credits=10, seed=None):
+        self.duration = duration
+        self.duration_jitter = duration_jitter
+        self.curve = curve
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.glb_size = glb_size
+        self.credits = credits
+        self.seed = seed
+
+
+class MockState:
+    """Tasks and request counters shared by the request handler threads."""
+
+    def __init__(self, config):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.tasks = {}
+        self.idempotency_keys = {}
+        self.ids = itertools.count(1)
+        self.glb = synthetic_glb(config.glb_size)
+        self.glb_etag = '"' + hashlib.sha1(self.glb).hexdigest()[:16] + '"'
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {"submit": 0, "poll": 0, "download": 0, "rate_limited": 0, "server_errors": 0,
+                          "download_bytes": 0}
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def chance(self, rate):
+        with self.lock:
+            return rate > 0 and self.random.random() < rate
+
+    def create_task(self, idempotency_key):
+        config = self.config
+        with self.lock:
+            if idempotency_key and idempotency_key in self.idempotency_keys:
+                return self.idempotency_keys[idempotency_key]
+            task_id = f"mock-{next(self.ids):06d}"
+            self.tasks[task_id] = {
+                "start": time.monotonic(),
+                "duration": max(0.0, config.duration + self.random.uniform(-1, 1) * config.duration_jitter),
+                "fails": config.failure_rate > 0 and self.random.random() < config.failure_rate,
+            }
+            if idempotency_key:
+                self.idempotency_keys[idempotency_key] = task_id
+            return task_id
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if path == "/stats/reset":
+            self.state.reset_stats()
+            return self._send_json(200, {})
+
+        self.state.count("submit")
+        if self._simulate_trouble():
+            return
+        if not self.headers.get("X-API-Key"):
+            return self._send_json(401, {"error": "Missing API key"})
+
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return self._send_json(400, {"error": "Invalid JSON"})
+        if not payload.get("imageData"):
+            return self._send_json(400, {"error": "imageData is required"})
+
+        task_id = self.state.create_task(self.headers.get("Idempotency-Key"))
+        response = {"taskId": task_id, "creditsUsed": self.state.config.credits}
+        if payload.get("aiEnhancement"):
+            response["enhancedImageUrl"] = self._url(f"files/{task_id}_enhanced.png")
+        self._send_json(200, response)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/stats":
+            with self.state.lock:
+                return self._send_json(200, dict(self.state.stats, tasks=len(self.state.tasks)))
+        if parts.path.startswith("/files/"):
+            return self._send_file(parts.path[len("/files/"):])
+
+        self.state.count("poll")
+        if self._simulate_trouble():
+            return
+
+        task_id = parse_qs(parts.query).get("taskId", [""])[0]
+        task = self.state.tasks.get(task_id)
+        if task is None:
+            return self._send_json(404, {"error": f"Unknown task {task_id}"})
+
+        elapsed = time.monotonic() - task["start"]
+        if elapsed < task["duration"]:
+            curve = PROGRESS_CURVES[self.state.config.curve]
+            progress = int(100 * curve(elapsed / task["duration"])) if task["duration"] else 0
+            return self._send_json(200, {"status": "processing", "progress": min(progress, 99)})
+        if task["fails"]:
+            return self._send_json(200, {"status": "failed", "error": "Simulated generation failure"})
+
+        glb_url = self._url(f"files/{task_id}.glb")
+        self._send_json(200, {
+            "status": "complete",
+            "progress": 100,
+            "modelUrl": glb_url,
+            "resultFiles": [
+                {"Type": "GLB", "Url": glb_url},
+                {"Type": "OBJ", "Url": self._url(f"files/{task_id}.obj")},
+            ],
+        })
+
+    def _simulate_trouble(self):
+        """Apply the configured latency, and answer with a 429 or 5xx if one is due."""
+        config = self.state.config
+        if config.latency:
+            time.sleep(config.latency)
+        if self.state.chance(config.rate_limit_rate):
+            self.state.count("rate_limited")
+            self._send_json(429, {"error": "Rate limit exceeded"}, {"Retry-After": f"{config.retry_after:g}"})
+            return True
+        if self.state.chance(config.error_rate):
+            self.state.count("server_errors")
+            self._send_json(503, {"error": "Simulated server error"})
+            return True
+        return False
+
+    def _send_file(self, name):
+        if name.endswith(".glb"):
+            body, content_type = self.state.glb, "model/gltf-binary"
+        elif name.endswith(".obj"):
+            body, content_type = b"v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n", "text/plain"
+        elif name.endswith(".png"):
+            body, content_type = b"\x89PNG\r\n\x1a\n", "image/png"
+        else:
+            return self._send_json(404, {"error": "Not found"})
+
+        self.state.count("download")
+        if self.state.config.latency:
+            time.sleep(self.state.config.latency)
+
+        # Single byte ranges, so that interrupted downloads can resume
+        start, status = 0, 200
+        etag = self.state.glb_etag if body is self.state.glb else '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        headers = {"Accept-Ranges": "bytes", "ETag": etag}
+        requested = self.headers.get("Range", "")
+        if requested.startswith("bytes=") and self.headers.get("If-Range", etag) == etag:
+            start = int(requested[len("bytes="):].split("-")[0] or 0)
+            if start >= len(body):
+                return self._send(416, b"", "text/plain", {"Content-Range": f"bytes */{len(body)}"})
+            status = 206
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+
+        self.state.count("download_bytes", len(body) - start)
+        self._send(status, body[start:], content_type, headers)
+
+    def _url(self, path):
+        return f"http://{self.headers.get('Host')}/{path}"
+
+    def _send_json(self, status, data, headers=None):
+        self._send(status, json.dumps(data).encode("utf-8"), "application/json", headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockServer:
+    """The mock API running on a background thread, for use from benchmarks."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.state = MockState(config or MockConfig())
+        handler = type("BoundMockHandler", (MockHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}/"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="bespokeai-mock", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self):
+        with self.state.lock:
+            return dict(self.state.stats)
+
+    def reset_stats(self):
+        self.state.reset_stats()
+
+    def completion_times(self):
+        """time.monotonic() at which each task completes (or fails), by task ID."""
+        with self.state.lock:
+            return {task_id: task["start"] + task["duration"] for task_id, task in self.state.tasks.items()}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def add_config_arguments(parser):
+    """Add the MockConfig options to an argparse parser."""
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds each task takes to complete")
+    parser.add_argument("--duration-jitter", type=float, default=0.0, help="Random +/- seconds added per task")
+    parser.add_argument("--curve", choices=sorted(PROGRESS_CURVES), default="ease", help="Reported progress curve")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of tasks that fail")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of API requests answered 429")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of API requests answered 503")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--glb-size", type=int, default=2 * 1024 * 1024, help="Size of the served GLB in bytes")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible failures and jitter")
+
+
+def config_from_args(args):
+    return MockConfig(duration=args.duration, duration_jitter=args.duration_jitter, curve=args.curve,
+                      latency=args.latency, failure_rate=args.failure_rate, rate_limit_rate=args.rate_limit_rate,
+                      error_rate=args.error_rate, retry_after=args.retry_after, glb_size=args.glb_size,
+                      seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockServer(config_from_args(args), args.host, args.port)
+    print(f"Mock BespokeAI API listening on {server.url}")
+    print(f"Set BESPOKEAI_API_URL={server.url} to point the nodes at it")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
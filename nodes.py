@@ -4,182 +4,1557 @@ Converts images to 3D models using BespokeAI's AI-powered pipeline.
 """
 
 import os
+import posixpath
 import time
+import asyncio
 import json
+import mmap
+import random
 import base64
+import errno
+import gzip
+import hashlib
+import itertools
 import shutil
+import struct
+import sys
+import threading
+import uuid
 import requests
 import numpy as np
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from email.utils import formatdate, parsedate_to_datetime
 from io import BytesIO
-from PIL import Image
+from urllib.parse import quote, urlsplit
+from PIL import Image, ImageOps
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 import folder_paths
 import comfy.utils
 
 
-class BespokeAI3DGeneration:
+# ComfyUI versions that ship comfy_execution.utils can run coroutine node
+# functions, which lets the executor overlap our API waits with other nodes.
+# Set BESPOKEAI_ASYNC=0 to force the blocking implementation.
+try:
+    from comfy_execution.utils import get_executing_context  # noqa: F401
+    ASYNC_NODES_SUPPORTED = os.environ.get("BESPOKEAI_ASYNC", "1").lower() not in ("0", "false", "no")
+except ImportError:
+    ASYNC_NODES_SUPPORTED = False
+
+
+# BespokeAI API endpoint. Override with BESPOKEAI_API_URL to use a staging
+# server or the local mock in benchmarks/mock_server.py.
+API_URL = os.environ.get("BESPOKEAI_API_URL", "https://heovujhdxkvbkaaguzwl.supabase.co/functions/v1/public-3d-api")
+
+
+# HTTP connection pooling, shared by every BespokeAI node in the process.
+# pool_connections is the number of distinct hosts kept alive, pool_maxsize the
+# number of keep-alive connections per host. With pool_block enabled, requests
+# wait for a free connection instead of opening extra, non-pooled ones.
+HTTP_POOL_CONNECTIONS = int(os.environ.get("BESPOKEAI_HTTP_POOL_CONNECTIONS", "8"))
+HTTP_POOL_MAXSIZE = int(os.environ.get("BESPOKEAI_HTTP_POOL_MAXSIZE", "64"))
+HTTP_POOL_BLOCK = os.environ.get("BESPOKEAI_HTTP_POOL_BLOCK", "0").lower() in ("1", "true", "yes")
+
+# Downloads are streamed to disk in chunks of this size, so memory use does not
+# grow with the size of the model.
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("BESPOKEAI_DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Result files of one task are downloaded concurrently by up to this many threads
+DOWNLOAD_WORKERS = int(os.environ.get("BESPOKEAI_DOWNLOAD_WORKERS", "4"))
+# Interrupted downloads are kept as .part files and resumed with HTTP Range
+# requests, up to this many times per download_file call.
+DOWNLOAD_RETRIES = int(os.environ.get("BESPOKEAI_DOWNLOAD_RETRIES", "3"))
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """Return the process-wide pooled requests.Session used for all API traffic."""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    pool_block=HTTP_POOL_BLOCK,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Connection": "keep-alive"})
+                _http_session = session
+    return _http_session
+
+
+# Process-wide rate limiting, shared by every BespokeAI node. At most
+# MAX_IN_FLIGHT tasks are submitted and not yet finished at any time, and
+# submits and polls are spread out by token buckets (requests per second, 0
+# disables a limit). Work over a limit waits for capacity instead of failing.
+# The default submit rate matches the documented 20 requests per minute.
+MAX_IN_FLIGHT = int(os.environ.get("BESPOKEAI_MAX_IN_FLIGHT", "16"))
+SUBMIT_RATE = float(os.environ.get("BESPOKEAI_SUBMIT_RATE", str(20 / 60)))
+POLL_RATE = float(os.environ.get("BESPOKEAI_POLL_RATE", "10"))
+# A submit answered with 429 is retried this many times, honouring Retry-After
+RATE_LIMIT_RETRIES = int(os.environ.get("BESPOKEAI_RATE_LIMIT_RETRIES", "8"))
+
+
+class TokenBucket:
+    """Blocking token bucket allowing `rate` acquisitions per second with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available."""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._refill()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+    def try_acquire(self):
+        """Take one token if one is available right now. Returns True if taken."""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            now = self._refill()
+            if now < self._paused_until or self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+    def pause(self, seconds):
+        """Hand out no tokens for the next `seconds`, e.g. after the server asked us to slow down."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class ApiLimiter:
     """
-    Generate 3D models from images using BespokeAI API.
-    Supports AI enhancement, PBR textures, low-poly mode, and part segmentation.
-    Output mesh_path can be connected to ComfyUI's built-in Preview3D node (model_file input).
+    Rate limits and in-flight task slots for the BespokeAI API.
+    A slot is taken before a submit and stays held by the submitted task until
+    the TaskPoller finishes it (or is given back at once if the submit fails).
     """
 
-    API_URL = "https://heovujhdxkvbkaaguzwl.supabase.co/functions/v1/public-3d-api"
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, submit_rate=SUBMIT_RATE, poll_rate=POLL_RATE):
+        self.submits = TokenBucket(submit_rate)
+        self.polls = TokenBucket(poll_rate)
+        self._slots = threading.Semaphore(max_in_flight) if max_in_flight > 0 else None
+        self._held = set()
+        self._lock = threading.Lock()
+
+    def acquire_slot(self):
+        """Wait for a free in-flight slot."""
+        if self._slots is not None:
+            self._slots.acquire()
+
+    def release_slot(self):
+        if self._slots is not None:
+            self._slots.release()
+
+    def try_reserve(self):
+        """
+        Take an in-flight slot and a submit token if both are free right now,
+        for a submit_generation(reserved=True) call. Returns True if taken.
+        """
+        if self._slots is not None and not self._slots.acquire(blocking=False):
+            return False
+        if not self.submits.try_acquire():
+            self.release_slot()
+            return False
+        return True
+
+    def hold_slot(self, task_id):
+        """Keep the slot taken by acquire_slot() until release_task(task_id)."""
+        with self._lock:
+            if task_id in self._held:
+                # Resubmission returned a known task, which already holds a slot
+                self.release_slot()
+            else:
+                self._held.add(task_id)
 
-    @classmethod
-    def INPUT_TYPES(cls):
-        return {
-            "required": {
-                "image": ("IMAGE",),
-                "api_key": ("STRING", {
-                    "default": "",
-                    "multiline": False,
-                    "placeholder": "bspk_your_api_key_here"
-                }),
-                "resolution": (["500k", "1m", "1.5m"], {"default": "1m"}),
-                "with_texture": ("BOOLEAN", {"default": True}),
-                "ai_enhancement": ("BOOLEAN", {"default": True}),
-            },
-            "optional": {
-                "low_poly": ("BOOLEAN", {"default": False}),
-                "segmentation": ("BOOLEAN", {"default": False}),
-                "prompt": ("STRING", {
-                    "default": "",
-                    "multiline": True,
-                    "placeholder": "Optional: Custom prompt for AI enhancement"
-                }),
-                "poll_interval": ("FLOAT", {"default": 5.0, "min": 2.0, "max": 30.0, "step": 1.0}),
-                "max_poll_attempts": ("INT", {"default": 120, "min": 10, "max": 600}),
-            }
-        }
+    def release_task(self, task_id):
+        """Free the slot held by a task, if any (tasks resumed from the journal hold none)."""
+        with self._lock:
+            if task_id not in self._held:
+                return
+            self._held.discard(task_id)
+        self.release_slot()
 
-    RETURN_TYPES = ("STRING", "STRING", "STRING")
-    RETURN_NAMES = ("mesh_path", "model_url", "enhanced_image_url")
-    FUNCTION = "generate_3d"
-    CATEGORY = "BespokeAI/3D"
-    OUTPUT_NODE = True
 
-    def __init__(self):
-        self.output_dir = folder_paths.get_output_directory()
-        self.model_dir = os.path.join(self.output_dir, "bespokeai_3d")
-        os.makedirs(self.model_dir, exist_ok=True)
+_api_limiter = None
+_api_limiter_lock = threading.Lock()
 
-    def image_to_base64(self, image_tensor):
-        """Convert ComfyUI IMAGE tensor to base64 PNG string."""
-        # ComfyUI images are [B, H, W, C] float tensors in range [0, 1]
-        if len(image_tensor.shape) == 4:
-            image_tensor = image_tensor[0]  # Take first image if batched
 
-        # Convert to numpy and scale to 0-255
-        img_np = (image_tensor.cpu().numpy() * 255).astype(np.uint8)
+def get_api_limiter():
+    """Return the process-wide ApiLimiter."""
+    global _api_limiter
+    with _api_limiter_lock:
+        if _api_limiter is None:
+            _api_limiter = ApiLimiter()
+    return _api_limiter
 
-        # Create PIL Image
-        pil_image = Image.fromarray(img_np)
 
-        # Convert to base64
-        buffer = BytesIO()
-        pil_image.save(buffer, format="PNG")
-        base64_str = base64.b64encode(buffer.getvalue()).decode("utf-8")
+# Async node executions submit on these threads instead of the event loop's
+# default executor: a submit can wait minutes for an in-flight slot or a submit
+# token, which must not starve ComfyUI's own executor work, downloads or the
+# model route of threads.
+SUBMIT_WORKERS = int(os.environ.get("BESPOKEAI_SUBMIT_WORKERS", "32"))
 
-        return f"data:image/png;base64,{base64_str}"
+_submit_executor = None
 
-    def submit_generation(self, api_key, image_data, resolution, with_texture,
-                          ai_enhancement, low_poly, segmentation, prompt):
-        """Submit 3D generation request to BespokeAI API."""
-        headers = {
-            "Content-Type": "application/json",
-            "X-API-Key": api_key
-        }
 
-        payload = {
-            "imageData": image_data,
-            "resolution": resolution,
-            "withTexture": with_texture,
-            "aiEnhancement": ai_enhancement,
-            "lowPoly": low_poly,
-            "segmentation": segmentation,
-        }
+def get_submit_executor():
+    """Return the process-wide executor for limiter-bound submits of async executions."""
+    global _submit_executor
+    with _api_limiter_lock:
+        if _submit_executor is None:
+            _submit_executor = ThreadPoolExecutor(max_workers=SUBMIT_WORKERS, thread_name_prefix="bespokeai-submit")
+    return _submit_executor
+
+
+# Retries of transient failures (connection errors, timeouts and 5xx responses)
+# on polls and downloads, with exponential backoff and full jitter.
+HTTP_RETRIES = int(os.environ.get("BESPOKEAI_HTTP_RETRIES", "4"))
+RETRY_BACKOFF = float(os.environ.get("BESPOKEAI_RETRY_BACKOFF", "1.0"))
+RETRY_MAX_DELAY = float(os.environ.get("BESPOKEAI_RETRY_MAX_DELAY", "30"))
+# Submits carry an Idempotency-Key header. A submit that never reached the
+# server is always retried; one whose outcome is unknown (read timeout, dropped
+# connection, 5xx) may already have been charged, so it is only retried when
+# the API is known to deduplicate on that key.
+IDEMPOTENT_SUBMIT = os.environ.get("BESPOKEAI_IDEMPOTENT_SUBMIT", "0").lower() in ("1", "true", "yes")
 
-        if prompt and prompt.strip():
-            payload["prompt"] = prompt.strip()
 
-        response = requests.post(self.API_URL, headers=headers, json=payload, timeout=60)
+class TransientHTTPError(RuntimeError):
+    """The API answered with a server error (5xx) that may succeed when retried."""
 
-        if response.status_code == 401:
-            raise ValueError("Invalid API key. Please check your BespokeAI API key.")
-        elif response.status_code == 402:
-            raise ValueError("Insufficient credits. Please add more credits to your BespokeAI account.")
-        elif response.status_code == 429:
-            raise ValueError("Rate limit exceeded. Please wait before making more requests.")
-        elif response.status_code == 400:
-            error_data = response.json()
-            raise ValueError(f"Invalid request: {error_data.get('error', 'Unknown error')}")
-        elif not response.ok:
-            raise RuntimeError(f"API request failed with status {response.status_code}: {response.text}")
 
-        return response.json()
+class RetryPolicy:
+    """Decides which HTTP failures are worth retrying and how long to wait before each retry."""
+
+    def __init__(self, retries=HTTP_RETRIES, backoff=RETRY_BACKOFF, max_delay=RETRY_MAX_DELAY):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt` (starting at 1), at least retry_after."""
+        delay = random.uniform(0, min(self.max_delay, self.backoff * 2 ** (attempt - 1)))
+        return max(delay, retry_after or 0.0)
+
+    @staticmethod
+    def is_transient(error):
+        if isinstance(error, (requests.ConnectionError, requests.Timeout,
+                              requests.exceptions.ChunkedEncodingError, TransientHTTPError)):
+            return True
+        response = getattr(error, "response", None)
+        return isinstance(error, requests.HTTPError) and response is not None and response.status_code >= 500
+
+    @staticmethod
+    def never_sent(error):
+        """True if the request failed before reaching the server, so resending cannot duplicate it."""
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+# Image encoding for upload. PNG and WebP are lossless; JPEG is encoded at high
+# quality without chroma subsampling for when payload size matters most.
+IMAGE_FORMATS = ["png", "webp", "jpeg"]
+_IMAGE_MIME_TYPES = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def encode_image(img_np, image_format="png", compress_level=6):
+    """
+    Encode a uint8 [H, W, C] array as a base64 data URL.
+    compress_level (0-9) trades PNG encode time for size; it is ignored by the
+    other formats. Returns (data_url, stats) where stats holds the encode time
+    in seconds and the encoded and base64 payload sizes in bytes.
+    """
+    start = time.perf_counter()
+
+    if img_np.ndim == 3 and img_np.shape[2] == 1:
+        img_np = img_np[:, :, 0]
+    pil_image = Image.fromarray(img_np)
+
+    buffer = BytesIO()
+    if image_format == "png":
+        pil_image.save(buffer, format="PNG", compress_level=compress_level)
+    elif image_format == "webp":
+        # Low effort: higher methods are an order of magnitude slower for ~5% smaller output
+        pil_image.save(buffer, format="WEBP", lossless=True, quality=25, method=1)
+    elif image_format == "jpeg":
+        if pil_image.mode not in ("RGB", "L"):
+            pil_image = pil_image.convert("RGB")
+        pil_image.save(buffer, format="JPEG", quality=95, subsampling=0)
+    else:
+        raise ValueError(f"Unsupported image format: {image_format}")
+
+    encoded = buffer.getvalue()
+    base64_str = base64.b64encode(encoded).decode("utf-8")
+    data_url = f"data:{_IMAGE_MIME_TYPES[image_format]};base64,{base64_str}"
+
+    stats = {
+        "encode_seconds": time.perf_counter() - start,
+        "encoded_bytes": len(encoded),
+        "payload_bytes": len(data_url),
+    }
+    return data_url, stats
+
+
+def downscale_image(img_np, max_edge):
+    """Resize a uint8 [H, W, C] array so its longest edge is at most max_edge (0 disables)."""
+    height, width = img_np.shape[:2]
+    if not max_edge or max(height, width) <= max_edge:
+        return img_np
+
+    scale = max_edge / max(height, width)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+
+    squeeze = img_np.ndim == 3 and img_np.shape[2] == 1
+    pil_image = Image.fromarray(img_np[:, :, 0] if squeeze else img_np)
+    resized = np.asarray(pil_image.resize(size, Image.LANCZOS, reducing_gap=3.0))
+    return resized[:, :, None] if squeeze else resized
+
+
+def image_to_array(image_tensor):
+    """Convert a ComfyUI IMAGE tensor to a uint8 [H, W, C] numpy array."""
+    # ComfyUI images are [B, H, W, C] float tensors in range [0, 1]
+    if len(image_tensor.shape) == 4:
+        image_tensor = image_tensor[0]  # Take first image if batched
+
+    # Scale, round and clamp in place on the tensor's own device, so only
+    # uint8 data (a quarter of the float32 size) is copied to the host
+    return image_tensor.mul(255).add_(0.5).clamp_(0, 255).byte().cpu().numpy()
+
+
+# Background polling. A single scheduler thread owns every in-flight task of the
+# process; due polls are fanned out to a small pool of HTTP workers so that a
+# slow response for one task does not delay the others.
+POLL_WORKERS = int(os.environ.get("BESPOKEAI_POLL_WORKERS", "8"))
+# Longest gap between two polls of a task that is still far from completion
+POLL_MAX_INTERVAL = float(os.environ.get("BESPOKEAI_POLL_MAX_INTERVAL", "30"))
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class GenerationFailedError(RuntimeError):
+    """The API reported that a generation task failed; polling it again will not help."""
+
+
+class PolledTask:
+    """State of one generation task tracked by the TaskPoller."""
+
+    def __init__(self, api_url, api_key, task_id, segmentation, poll_interval, max_attempts):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.task_id = task_id
+        self.segmentation = segmentation
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+
+        # The time budget is unchanged from fixed-interval polling, but adaptive
+        # polling spends it on far fewer requests.
+        self.deadline = time.monotonic() + max_attempts * poll_interval
+
+        self.attempts = 0
+        self.idle_polls = 0
+        self.failures = 0
+        # Every poll request sent, including failed and rate-limited ones
+        self.requests = 0
+        self.status = "pending"
+        self.progress = 0
+        self.samples = deque(maxlen=8)
+        self.retry_after = None
+        self.next_poll = time.monotonic()
+        self.in_flight = False
+        self.future = Future()
+        self.started = time.monotonic()
+        self.finished = None
+
+    def record_progress(self, progress):
+        """Store a progress sample; polls without forward progress count as idle."""
+        now = time.monotonic()
+        if self.samples and progress <= self.samples[-1][1]:
+            self.idle_polls += 1
+        else:
+            self.idle_polls = 0
+            self.samples.append((now, progress))
+        self.progress = progress
+
+    def sample_span(self):
+        """Seconds and progress points covered by the progress samples."""
+        if len(self.samples) < 2:
+            return 0.0, 0
+        (t0, p0), (t1, p1) = self.samples[0], self.samples[-1]
+        return t1 - t0, p1 - p0
+
+    def eta(self):
+        """Estimated seconds until completion from the observed progress rate, or None."""
+        if len(self.samples) < 2:
+            return None
+        (t0, p0), (t1, p1) = self.samples[0], self.samples[-1]
+        if t1 <= t0 or p1 <= p0:
+            return None
+        rate = (p1 - p0) / (t1 - t0)
+        # Account for the time elapsed since the last sample moved forward
+        return max(0.0, (100 - p1) / rate - (time.monotonic() - t1))
+
+
+class AdaptivePollPolicy:
+    """
+    Chooses the delay before the next poll of a task.
+    Polls sparsely while the progress-based ETA is far away and densely near
+    completion (never faster than the task's poll_interval), backs off
+    exponentially while there is no usable progress signal, adds jitter so that
+    tasks submitted together do not poll in lockstep, and honours Retry-After.
+
+    The ETA is only used once the progress samples span min_eta_progress
+    points or min_eta_seconds: a rate taken from the first few percent is
+    often far too slow, since progress tends to accelerate. Independently of
+    the ETA, no delay exceeds elapsed_fraction of the time the task has been
+    running, which bounds how late completion can be noticed.
+    """
 
-    def poll_task(self, api_key, task_id, segmentation, poll_interval, max_attempts, pbar=None):
-        """Poll for task completion with progress updates."""
-        headers = {"X-API-Key": api_key}
+    def __init__(self, max_interval=POLL_MAX_INTERVAL, eta_fraction=0.5, backoff=1.5, jitter=0.2,
+                 min_eta_progress=10, min_eta_seconds=60, elapsed_fraction=0.25):
+        self.max_interval = max_interval
+        self.eta_fraction = eta_fraction
+        self.backoff = backoff
+        self.jitter = jitter
+        self.min_eta_progress = min_eta_progress
+        self.min_eta_seconds = min_eta_seconds
+        self.elapsed_fraction = elapsed_fraction
+
+    def next_delay(self, task):
+        min_interval = task.poll_interval
+        max_interval = max(self.max_interval, min_interval)
+
+        seconds, progress = task.sample_span()
+        eta = task.eta() if progress >= self.min_eta_progress or seconds >= self.min_eta_seconds else None
+        if eta is None:
+            delay = min_interval * (self.backoff ** task.idle_polls)
+        else:
+            delay = eta * self.eta_fraction
+        delay = min(delay, (time.monotonic() - task.started) * self.elapsed_fraction)
+
+        # Clamp after jittering so that no poll comes sooner than poll_interval
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        delay = min(max(delay, min_interval), max_interval)
+
+        if task.retry_after is not None:
+            delay = max(delay, task.retry_after)
+        return delay
+
+
+class TaskPoller:
+    """
+    Polls all in-flight BespokeAI tasks from one background loop.
+    Node executions register a task with track() and wait on the returned
+    PolledTask.future, which resolves to the final status payload.
+    """
 
-        params = {"taskId": task_id}
-        if segmentation:
+    def __init__(self, max_workers=POLL_WORKERS, policy=None, retry_policy=None):
+        self.policy = policy or AdaptivePollPolicy()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._workers = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bespokeai-poll")
+        self._thread = None
+
+    def track(self, api_url, api_key, task_id, segmentation, poll_interval, max_attempts):
+        """Start polling a task (or join an existing poll of the same task)."""
+        key = (api_url, task_id, bool(segmentation))
+
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                task = PolledTask(api_url, api_key, task_id, segmentation, poll_interval, max_attempts)
+                self._tasks[key] = task
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="bespokeai-poller", daemon=True)
+                self._thread.start()
+
+        self._wakeup.set()
+        return task
+
+    def _run(self):
+        while True:
+            now = time.monotonic()
+            next_wake = None
+
+            with self._lock:
+                for task in self._tasks.values():
+                    if task.in_flight:
+                        continue
+                    if task.next_poll <= now:
+                        task.in_flight = True
+                        self._workers.submit(self._poll, task)
+                    elif next_wake is None or task.next_poll < next_wake:
+                        next_wake = task.next_poll
+
+            timeout = None if next_wake is None else max(0.0, next_wake - now)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def _finish(self, task, result=None, error=None):
+        task.finished = time.monotonic()
+        with self._lock:
+            self._tasks.pop((task.api_url, task.task_id, bool(task.segmentation)), None)
+        get_api_limiter().release_task(task.task_id)
+
+        if error is not None:
+            task.future.set_exception(error)
+        else:
+            task.future.set_result(result)
+
+    def _reschedule(self, task):
+        now = time.monotonic()
+        if now >= task.deadline:
+            self._finish(task, error=TimeoutError(
+                f"Task did not complete within {task.max_attempts * task.poll_interval} seconds"))
+            return
+
+        # Never sleep past the deadline, so a timeout is reported on time
+        task.next_poll = min(now + self.policy.next_delay(task), task.deadline)
+        task.in_flight = False
+        self._wakeup.set()
+
+    def _poll(self, task):
+        try:
+            self._poll_once(task)
+        except Exception as e:
+            # Never leave a waiter hanging on an unexpected error
+            if not task.future.done():
+                self._finish(task, error=e)
+
+    def _poll_once(self, task):
+        headers = {"X-API-Key": task.api_key}
+
+        params = {"taskId": task.task_id}
+        if task.segmentation:
             params["segmentation"] = "true"
 
-        for attempt in range(max_attempts):
-            response = requests.get(self.API_URL, headers=headers, params=params, timeout=30)
+        limiter = get_api_limiter()
+        limiter.polls.acquire()
+
+        task.requests += 1
+        try:
+            response = get_http_session().get(task.api_url, headers=headers, params=params, timeout=30)
+            task.retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+            if response.status_code == 429:
+                print(f"[BespokeAI] Rate limited while polling {task.task_id}, backing off...")
+                limiter.polls.pause(task.retry_after or task.poll_interval)
+                task.idle_polls += 1
+                self._reschedule(task)
+                return
+
+            if response.status_code >= 500:
+                raise TransientHTTPError(f"Polling failed with status {response.status_code}: {response.text}")
 
             if not response.ok:
                 error_data = response.json() if response.text else {}
                 raise RuntimeError(f"Polling failed: {error_data.get('error', response.text)}")
 
             data = response.json()
-            status = data.get("status", "unknown")
-
-            if status == "complete":
-                if pbar:
-                    pbar.update_absolute(100)
-                return data
-            elif status == "processing":
-                progress = data.get("progress", 0)
-                # Update progress bar - reserve 10-90% for processing, 90-100% for download
-                if pbar and progress > 0:
-                    pbar.update_absolute(10 + int(progress * 0.8))
-                print(f"[BespokeAI] Processing... {progress}% (attempt {attempt + 1}/{max_attempts})")
-                time.sleep(poll_interval)
-            elif status == "failed" or "error" in data:
-                raise RuntimeError(f"Generation failed: {data.get('error', 'Unknown error')}")
+        except Exception as e:
+            # The task is already paid for: ride out flaky polls instead of failing it
+            if RetryPolicy.is_transient(e) and task.failures < self.retry_policy.retries:
+                task.failures += 1
+                task.retry_after = self.retry_policy.delay(task.failures, task.retry_after)
+                print(f"[BespokeAI] Polling {task.task_id} failed ({e}), "
+                      f"retry {task.failures}/{self.retry_policy.retries}...")
+                self._reschedule(task)
+                return
+            self._finish(task, error=e)
+            return
+
+        task.failures = 0
+        task.attempts += 1
+        task.status = data.get("status", "unknown")
+
+        if task.status == "complete":
+            task.progress = 100
+            self._finish(task, result=data)
+        elif task.status == "processing":
+            task.record_progress(data.get("progress", 0))
+            eta = task.eta()
+            eta_text = f", ETA {int(eta)}s" if eta is not None else ""
+            print(f"[BespokeAI] Processing {task.task_id}... {task.progress}%{eta_text} (poll {task.attempts})")
+            self._reschedule(task)
+        elif task.status == "failed" or "error" in data:
+            self._finish(task, error=GenerationFailedError(f"Generation failed: {data.get('error', 'Unknown error')}"))
+        else:
+            task.idle_polls += 1
+            print(f"[BespokeAI] Status of {task.task_id}: {task.status} (poll {task.attempts})")
+            self._reschedule(task)
+
+
+_task_poller = None
+_task_poller_lock = threading.Lock()
+
+
+def get_task_poller():
+    """Return the process-wide TaskPoller, starting it on first use."""
+    global _task_poller
+    with _task_poller_lock:
+        if _task_poller is None:
+            _task_poller = TaskPoller()
+    return _task_poller
+
+
+# Result cache. Finished generations are stored on disk keyed on a hash of the
+# decoded input pixels and every option that affects the output, so re-running
+# a workflow with the same image and settings returns instantly without
+# spending credits. The cache is bounded by the total size of its mesh files
+# and evicts least recently used entries first.
+CACHE_MAX_BYTES = int(float(os.environ.get("BESPOKEAI_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+
+
+def compute_cache_key(source, params):
+    """
+    Hash generation inputs into a cache key.
+    source is either a uint8 pixel array (hashed with its shape) or a string
+    such as an image URL; params holds the generation options.
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, np.ndarray):
+        digest.update(repr(source.shape).encode("utf-8"))
+        digest.update(np.ascontiguousarray(source).data)
+    else:
+        digest.update(str(source).encode("utf-8"))
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Persistent, size-bounded LRU cache of generation results."""
+
+    def __init__(self, cache_dir, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        os.makedirs(cache_dir, exist_ok=True)
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+                # Stored oldest access first, which is the OrderedDict LRU order
+                for key, entry in sorted(entries.items(), key=lambda item: item[1].get("last_access", 0)):
+                    self._entries[key] = entry
+            except (OSError, ValueError) as e:
+                print(f"[BespokeAI] Warning: Ignoring unreadable cache index: {e}")
+
+    def get(self, key):
+        """Return the cached result for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if not all(os.path.exists(path) for path in self._entry_paths(entry)):
+                # A cached file was removed behind our back
+                del self._entries[key]
+                self._save()
+                return None
+
+            entry["last_access"] = time.time()
+            self._entries.move_to_end(key)
+            self._save()
+            return dict(entry)
+
+    def put(self, key, mesh_path, model_url, enhanced_image_url, files=None, complete_set=False):
+        """
+        Store a result, keeping cache-owned copies (hardlinks when possible) of
+        the mesh and of any other downloaded files. files maps a file type to a
+        list of paths; complete_set marks that every result file was downloaded.
+        """
+        cached_paths = {}
+        all_paths = [mesh_path] + [p for paths in (files or {}).values() for p in paths]
+        for index, path in enumerate(dict.fromkeys(all_paths)):
+            if not path:
+                continue
+            suffix = "" if path == mesh_path else f"_{index}"
+            cached_path = os.path.join(self.cache_dir, key + suffix + os.path.splitext(path)[1])
+            if os.path.exists(cached_path):
+                os.remove(cached_path)
+            try:
+                os.link(path, cached_path)
+            except OSError:
+                shutil.copy2(path, cached_path)
+            cached_paths[path] = cached_path
+
+        with self._lock:
+            self._entries[key] = {
+                "mesh_path": cached_paths.get(mesh_path, ""),
+                "model_url": model_url,
+                "enhanced_image_url": enhanced_image_url,
+                "files": {file_type: [cached_paths[p] for p in paths] for file_type, paths in (files or {}).items()},
+                "complete_set": complete_set,
+                "size": sum(os.path.getsize(p) for p in cached_paths.values()),
+                "last_access": time.time(),
+            }
+            self._entries.move_to_end(key)
+            self._evict()
+            self._save()
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry["size"]
+            for path in self._entry_paths(entry):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    @staticmethod
+    def _entry_paths(entry):
+        paths = [entry["mesh_path"]] + [p for paths in entry.get("files", {}).values() for p in paths]
+        return {path for path in paths if path}
+
+    def _save(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.index_path)
+
+
+_result_caches = {}
+_result_caches_lock = threading.Lock()
+
+
+def get_result_cache(model_dir):
+    """Return the shared ResultCache stored under model_dir/cache."""
+    with _result_caches_lock:
+        cache = _result_caches.get(model_dir)
+        if cache is None:
+            cache = ResultCache(os.path.join(model_dir, "cache"))
+            _result_caches[model_dir] = cache
+    return cache
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into a single execution.
+    The first caller runs the function; callers arriving while it is in flight
+    wait for and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            print("[BespokeAI] Identical generation already in flight, waiting for its result...")
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def do_async(self, key, fn):
+        """Like do(), for a coroutine function; shares in-flight calls with do()."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            print("[BespokeAI] Identical generation already in flight, waiting for its result...")
+            return await asyncio.wrap_future(future)
+
+        try:
+            result = await fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+# Generations in flight, keyed like the result cache
+_generation_flights = SingleFlight()
+# Submissions in flight, keyed like the result cache
+_submission_flights = SingleFlight()
+# Result downloads in flight, keyed on (task ID, download_all)
+_download_flights = SingleFlight()
+
+
+# Job journal. Every submitted task is appended to output/bespokeai_3d/jobs.jsonl
+# together with the key of its inputs, so that a generation interrupted by a
+# ComfyUI restart (or a polling timeout) is resumed, not paid for again, the
+# next time a node runs with the same inputs.
+
+
+class JobJournal:
+    """
+    Append-only JSONL log of submitted generation tasks.
+    Records are kept per task ID: executions with the same inputs and no cache
+    each submit their own task, and every one of them stays resumable until it
+    finishes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._active = set()
+
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        task_id = record["task_id"]
+                    except (ValueError, KeyError):
+                        continue  # Torn write from a crash
+                    self._jobs.setdefault(task_id, {}).update(record)
+
+            # Compact: only unfinished jobs are worth keeping across restarts
+            self._jobs = {task_id: job for task_id, job in self._jobs.items() if job.get("status") == "submitted"}
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for job in self._jobs.values():
+                    f.write(json.dumps(job) + "\n")
+            os.replace(tmp_path, path)
+
+            if self._jobs:
+                print(f"[BespokeAI] {len(self._jobs)} unfinished generation(s) in the job journal "
+                      "will resume when their node runs again")
+
+    def claim(self, key):
+        """Return an unfinished job for key that nobody is currently waiting on, marking it as taken."""
+        with self._lock:
+            for task_id, job in self._jobs.items():
+                if job["key"] == key and task_id not in self._active:
+                    self._active.add(task_id)
+                    return dict(job)
+            return None
+
+    def active(self, key):
+        """Return an unfinished job for key that an execution of this process already holds, or None."""
+        with self._lock:
+            for task_id in self._active:
+                job = self._jobs.get(task_id)
+                if job is not None and job["key"] == key:
+                    return dict(job)
+            return None
+
+    def submitted(self, key, task_id, enhanced_image_url=""):
+        """Record a newly submitted task for key."""
+        with self._lock:
+            self._active.add(task_id)
+        self._append({"key": key, "status": "submitted", "task_id": task_id,
+                      "enhanced_image_url": enhanced_image_url})
+
+    @contextmanager
+    def running(self, task_id):
+        """
+        Context for waiting on a journaled task: records its outcome and releases it.
+        The task stays resumable only when waiting ends in a timeout, a transient
+        error or an interruption. Any other error, such as a failed generation or
+        a 4xx poll for an expired or unknown task, would recur on every resume.
+        """
+        try:
+            yield
+        except Exception as e:
+            if not isinstance(e, TimeoutError) and not RetryPolicy.is_transient(e):
+                self._append({"task_id": task_id, "status": "failed"})
+            raise
+        else:
+            self._append({"task_id": task_id, "status": "done"})
+        finally:
+            with self._lock:
+                self._active.discard(task_id)
+
+    def _append(self, record):
+        record["time"] = time.time()
+
+        with self._lock:
+            if record["status"] == "submitted":
+                self._jobs[record["task_id"]] = record
             else:
-                # Unknown status - still increment progress slightly to show activity
-                if pbar:
-                    current_progress = 10 + min(attempt * 2, 70)
-                    pbar.update_absolute(current_progress)
-                print(f"[BespokeAI] Status: {status} (attempt {attempt + 1}/{max_attempts})")
-                time.sleep(poll_interval)
+                self._jobs.pop(record["task_id"], None)
+
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+_job_journals = {}
+_job_journals_lock = threading.Lock()
+
+
+def get_job_journal(model_dir):
+    """Return the shared JobJournal stored in model_dir/jobs.jsonl."""
+    with _job_journals_lock:
+        journal = _job_journals.get(model_dir)
+        if journal is None:
+            journal = JobJournal(os.path.join(model_dir, "jobs.jsonl"))
+            _job_journals[model_dir] = journal
+    return journal
+
+
+# Metrics. Every finished generation is recorded in process: totals per
+# outcome, and per-generation measurements whose sums and quantiles over the
+# last METRICS_HISTORY generations are served as JSON or Prometheus text.
+METRICS_HISTORY = int(os.environ.get("BESPOKEAI_METRICS_HISTORY", "1000"))
+
+# Measurement name -> help text, in seconds unless stated otherwise
+METRICS = {
+    "encode_seconds": "Time spent encoding the image for upload",
+    "payload_bytes": "Size of the uploaded imageData in bytes",
+    "queue_wait_seconds": "Time a submit waited for an in-flight slot and rate limiter tokens",
+    "submit_seconds": "Latency of the submit request",
+    "poll_count": "Status polls until the task settled",
+    "server_seconds": "Time from submission until the task settled on the server",
+    "download_bytes": "Bytes downloaded",
+    "download_bytes_per_second": "Download throughput in bytes per second",
+    "total_seconds": "Wall time from node execution to outputs",
+}
 
-        raise TimeoutError(f"Task did not complete within {max_attempts * poll_interval} seconds")
 
-    def download_file(self, url, filename):
-        """Download a file from URL to the output directory."""
-        filepath = os.path.join(self.model_dir, filename)
+class GenerationMetrics:
+    """Thread-safe in-process store of generation metrics."""
+
+    def __init__(self, history=METRICS_HISTORY):
+        self._lock = threading.Lock()
+        self._outcomes = {}
+        self._sums = {name: [0, 0.0] for name in METRICS}
+        self._recent = deque(maxlen=history)
+
+    def record(self, job, outcome):
+        """Record a finished job; outcome is "done", "cached" or "failed"."""
+        values = dict(job.metrics)
+        values["total_seconds"] = time.perf_counter() - job.created
+        if "encode" in job.timings:
+            values["encode_seconds"] = job.timings["encode"]
+        if values.get("download_seconds"):
+            values["download_bytes_per_second"] = values["download_bytes"] / values["download_seconds"]
+        values = {name: value for name, value in values.items() if name in METRICS}
+
+        with self._lock:
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+            for name, value in values.items():
+                self._sums[name][0] += 1
+                self._sums[name][1] += value
+            self._recent.append({"task_id": job.task_id, "outcome": outcome, "time": time.time(), **values})
+
+    def snapshot(self):
+        """Return every metric as a JSON-serialisable dict."""
+        with self._lock:
+            recent = list(self._recent)
+            outcomes = dict(self._outcomes)
+            sums = {name: list(totals) for name, totals in self._sums.items()}
+
+        summaries = {}
+        for name, (count, total) in sums.items():
+            samples = sorted(entry[name] for entry in recent if name in entry)
+            summaries[name] = {
+                "count": count,
+                "sum": total,
+                "p50": self._quantile(samples, 0.5),
+                "p95": self._quantile(samples, 0.95),
+                "p99": self._quantile(samples, 0.99),
+            }
 
-        response = requests.get(url, timeout=120)
-        response.raise_for_status()
+        return {"generations": outcomes, "metrics": summaries, "recent": recent}
+
+    def prometheus(self):
+        """Return every metric in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP bespokeai_generations_total Finished generations by outcome",
+            "# TYPE bespokeai_generations_total counter",
+        ]
+        for outcome, count in sorted(snapshot["generations"].items()):
+            lines.append(f'bespokeai_generations_total{{outcome="{outcome}"}} {count}')
+
+        for name, summary in snapshot["metrics"].items():
+            metric = f"bespokeai_{name}"
+            lines.append(f"# HELP {metric} {METRICS[name]}")
+            lines.append(f"# TYPE {metric} summary")
+            for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                if summary[key] is not None:
+                    lines.append(f'{metric}{{quantile="{quantile}"}} {summary[key]}')
+            lines.append(f"{metric}_sum {summary['sum']}")
+            lines.append(f"{metric}_count {summary['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _quantile(samples, q):
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+generation_metrics = GenerationMetrics()
+
+# Serve the metrics from ComfyUI's web server: GET /bespokeai/metrics returns
+# JSON, GET /bespokeai/metrics?format=prometheus the Prometheus text format.
+try:
+    from aiohttp import web
+    from server import PromptServer
+except ImportError:
+    PromptServer = None
+
+if getattr(PromptServer, "instance", None) is not None:
+    @PromptServer.instance.routes.get("/bespokeai/metrics")
+    async def get_bespokeai_metrics(request):
+        if request.query.get("format") == "prometheus":
+            return web.Response(body=generation_metrics.prometheus().encode("utf-8"),
+                                headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+        return web.json_response(generation_metrics.snapshot())
+
+
+# Serve generated models straight from output/bespokeai_3d: GET
+# /bespokeai/models/<path> streams a model or result file with Range requests,
+# ETag/Last-Modified revalidation and gzip or brotli encoding, so the preview
+# loads models without copying them into input/3d and browsers cache them.
+# Encoded variants are built in the background on first request and stored in
+# output/bespokeai_3d/.encoded; the identity file is served until they are ready.
+# BESPOKEAI_SERVE_ENCODINGS lists the accepted encodings in order of preference
+# ("" disables compression; "br" needs the Brotli package).
+SERVE_ENCODINGS = [
+    encoding.strip() for encoding in os.environ.get("BESPOKEAI_SERVE_ENCODINGS", "br,gzip").lower().split(",")
+    if encoding.strip()
+]
+# Variants take up at most this much disk, least recently served removed first.
+# Variants of deleted or changed models are removed as well, and one that
+# saves less than MIN_ENCODING_SAVINGS of the model's size is not kept: an
+# empty marker stops that version of the model from being compressed again.
+ENCODED_MAX_BYTES = int(float(os.environ.get("BESPOKEAI_ENCODED_MAX_MB", "1024")) * 1024 * 1024)
+MIN_ENCODING_SAVINGS = 0.1
+SERVED_TYPES = {
+    ".glb": "model/gltf-binary",
+    ".gltf": "model/gltf+json",
+    ".bin": "application/octet-stream",
+    ".obj": "model/obj",
+    ".mtl": "model/mtl",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+}
+# Already compressed formats are always served as they are
+COMPRESSIBLE_TYPES = (".glb", ".gltf", ".bin", ".obj", ".mtl")
+MODEL_ROUTE = "/bespokeai/models"
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Destination path -> task building it; holding the tasks here keeps them from
+# being garbage collected, since the event loop only references them weakly
+_encoding_jobs = {}
+
+
+def get_model_root():
+    return os.path.join(folder_paths.get_output_directory(), "bespokeai_3d")
+
+
+def resolve_served_file(relative_path):
+    """Map a request path to a servable file under output/bespokeai_3d, or None."""
+    parts = [part for part in relative_path.replace("\\", "/").split("/") if part]
+    if not parts or any(part.startswith(".") for part in parts):
+        return None
+    if os.path.splitext(parts[-1])[1].lower() not in SERVED_TYPES:
+        return None
+
+    root = os.path.realpath(get_model_root())
+    path = os.path.realpath(os.path.join(root, *parts))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+
+def served_url(path):
+    """URL of a file under output/bespokeai_3d on the model route, or None for other paths."""
+    root = os.path.realpath(get_model_root())
+    path = os.path.realpath(path)
+    if os.path.commonpath([root, path]) != root:
+        return None
+    parts = os.path.relpath(path, root).split(os.sep)
+    if resolve_served_file("/".join(parts)) is None:
+        return None
+    return MODEL_ROUTE + "/" + "/".join(quote(part) for part in parts)
+
+
+def accepted_encodings(header):
+    """Encodings from an Accept-Encoding header that we can produce, best first."""
+    accepted = {}
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    usable = [encoding for encoding in SERVE_ENCODINGS
+              if encoding in ("gzip", "br") and (encoding != "br" or brotli is not None)
+              and accepted.get(encoding, accepted.get("*", 0.0)) > 0]
+    return sorted(usable, key=lambda encoding: -accepted.get(encoding, accepted.get("*", 0.0)))
+
+
+def encoded_path(path, encoding):
+    """Where the encoded variant of a served file is kept: its path under .encoded, plus .gz or .br."""
+    root = os.path.realpath(get_model_root())
+    relative_path = os.path.relpath(os.path.realpath(path), root)
+    return os.path.join(root, ".encoded", f"{relative_path}.{'br' if encoding == 'br' else 'gz'}")
+
+
+def encode_served_file(path, dest, encoding):
+    """
+    Write the gzip or brotli encoding of path to dest, stamped with the source
+    mtime. dest is left empty if the encoding saves too little to be worth keeping.
+    """
+    source_stat = os.stat(path)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    temp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(path, "rb") as src, open(temp_path, "wb") as out:
+            if encoding == "br":
+                compressor = brotli.Compressor(quality=5)
+                for chunk in iter(lambda: src.read(DOWNLOAD_CHUNK_SIZE), b""):
+                    out.write(compressor.process(chunk))
+                out.write(compressor.finish())
+            else:
+                with gzip.GzipFile(filename="", mode="wb", compresslevel=6, fileobj=out, mtime=0) as gz:
+                    shutil.copyfileobj(src, gz, DOWNLOAD_CHUNK_SIZE)
+        if os.path.getsize(temp_path) > source_stat.st_size * (1 - MIN_ENCODING_SAVINGS):
+            open(temp_path, "wb").close()
+        # The mtime ties the variant to this version of the source file
+        os.utime(temp_path, ns=(source_stat.st_mtime_ns, source_stat.st_mtime_ns))
+        os.replace(temp_path, dest)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def select_representation(path, accept_encoding):
+    """
+    Pick the file to send for a request: (file_path, encoding or None).
+    Encoded variants are used when current and smaller than the source;
+    missing or stale ones are (re)built in the background.
+    """
+    if os.path.splitext(path)[1].lower() not in COMPRESSIBLE_TYPES:
+        return path, None
+
+    source_stat = os.stat(path)
+    for encoding in accepted_encodings(accept_encoding):
+        dest = encoded_path(path, encoding)
+        try:
+            encoded_stat = os.stat(dest)
+        except FileNotFoundError:
+            encoded_stat = None
+
+        if encoded_stat is not None and encoded_stat.st_mtime_ns == source_stat.st_mtime_ns:
+            if 0 < encoded_stat.st_size < source_stat.st_size:
+                try:
+                    # The access time orders variants for prune_encoded_files()
+                    os.utime(dest, ns=(time.time_ns(), encoded_stat.st_mtime_ns))
+                except FileNotFoundError:
+                    continue
+                return dest, encoding
+            continue
+
+        if dest not in _encoding_jobs:
+            _encoding_jobs[dest] = asyncio.get_running_loop().create_task(_build_encoding(path, dest, encoding))
+    return path, None
+
+
+async def _build_encoding(path, dest, encoding):
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, encode_served_file, path, dest, encoding)
+        await loop.run_in_executor(None, prune_encoded_files)
+    except OSError as e:
+        print(f"[BespokeAI] Could not {encoding}-encode {os.path.basename(path)}: {e}")
+    finally:
+        _encoding_jobs.pop(dest, None)
+
+
+def prune_encoded_files(max_bytes=None):
+    """
+    Remove encoded variants whose model was deleted or changed, then the least
+    recently served ones until the rest fit in max_bytes (ENCODED_MAX_BYTES).
+    """
+    max_bytes = ENCODED_MAX_BYTES if max_bytes is None else max_bytes
+    root = os.path.realpath(get_model_root())
+    encoded_root = os.path.join(root, ".encoded")
+
+    variants = []
+    for dirpath, _, filenames in os.walk(encoded_root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            stem, ext = os.path.splitext(name)
+            if ext not in (".gz", ".br"):
+                continue  # Temporary file of a build in progress
+            source = os.path.join(root, os.path.relpath(os.path.join(dirpath, stem), encoded_root))
+            try:
+                stat = os.stat(path)
+                current = os.stat(source).st_mtime_ns == stat.st_mtime_ns
+            except FileNotFoundError:
+                current = False
+            if not current:
+                _remove_quietly(path)
+            elif stat.st_size:
+                # Empty markers take no space and are kept while their model is unchanged
+                variants.append((stat.st_atime_ns, stat.st_size, path))
+
+    total = sum(size for _, size, _ in variants)
+    for _, size, path in sorted(variants):
+        if total <= max_bytes:
+            break
+        _remove_quietly(path)
+        total -= size
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def etag_matches(header, etag):
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+async def send_served_file(request, path, content_type, encoding=None):
+    """Stream a file honouring conditional and single-range requests."""
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}{"-" + encoding if encoding else ""}"'
+    headers = {
+        "Content-Type": content_type,
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": "no-cache",
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+    }
+    if encoding:
+        headers["Content-Encoding"] = encoding
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        if etag_matches(if_none_match, etag):
+            return web.Response(status=304, headers=headers)
+    elif request.if_modified_since is not None and int(stat.st_mtime) <= request.if_modified_since.timestamp():
+        return web.Response(status=304, headers=headers)
+
+    start, end, status = 0, size, 200
+    if_range = request.headers.get("If-Range")
+    if "Range" in request.headers and (if_range is None or if_range == etag):
+        try:
+            requested = request.http_range
+        except ValueError:
+            requested = None
+        if requested is not None and (requested.start is not None or requested.stop is not None):
+            # Also resolves suffix ranges ("bytes=-500" is slice(-500, None))
+            start, stop, _ = requested.indices(size)
+            if start >= size or stop <= start:
+                return web.Response(status=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+            end, status = stop, 206
+            headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+
+    response = web.StreamResponse(status=status, headers=headers)
+    response.content_length = end - start
+    await response.prepare(request)
+    if request.method != "HEAD":
+        loop = asyncio.get_running_loop()
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = await loop.run_in_executor(None, f.read, min(DOWNLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                await response.write(chunk)
+                remaining -= len(chunk)
+    await response.write_eof()
+    return response
+
+
+MODEL_ROUTE_ENABLED = getattr(PromptServer, "instance", None) is not None
+
+if MODEL_ROUTE_ENABLED:
+    @PromptServer.instance.routes.get(MODEL_ROUTE + "/{path:.+}")
+    async def get_bespokeai_model(request):
+        path = resolve_served_file(request.match_info["path"])
+        if path is None:
+            return web.Response(status=404)
+        content_type = SERVED_TYPES[os.path.splitext(path)[1].lower()]
+        if "Range" in request.headers:
+            # Byte ranges of an encoded variant cannot be decoded on their own
+            file_path, encoding = path, None
+        else:
+            file_path, encoding = select_representation(path, request.headers.get("Accept-Encoding"))
+        return await send_served_file(request, file_path, content_type, encoding)
+
+
+# Stage hooks, called as hook(stage, seconds, job) after every pipeline stage
+# ("prepare", "encode", "submit", "poll", "download") of every generation.
+_stage_hooks = []
+
+
+def add_stage_hook(hook):
+    """Register a callable receiving (stage, seconds, job) after each pipeline stage."""
+    _stage_hooks.append(hook)
+
+
+class ImageInput:
+    """Input stage for a ComfyUI IMAGE tensor, uploaded as an encoded data URL."""
+
+    def __init__(self, image):
+        self.image = image
+        self.array = None
+
+    @classmethod
+    def from_batch(cls, image, batch_mode):
+        """One input per image of a [B, H, W, C] batch, or only the first one without batch_mode."""
+        if len(image.shape) == 4 and image.shape[0] > 1:
+            if batch_mode:
+                return [cls(image[i]) for i in range(image.shape[0])]
+            print(f"[BespokeAI] Warning: Batch of {image.shape[0]} images received, only the first one "
+                  "is used. Enable batch_mode to generate all of them.")
+            return [cls(image[0])]
+        return [cls(image)]
+
+    def load(self):
+        """Return the image as a uint8 [H, W, C] array."""
+        return image_to_array(self.image)
+
+    def prepare(self, options):
+        """Load and optionally downscale the image. Returns the data the cache key is computed from."""
+        print("[BespokeAI] Preparing image...")
+        img_np = self.load()
 
-        with open(filepath, "wb") as f:
-            f.write(response.content)
+        # Downscale before hashing, so the cache key matches what is uploaded
+        max_edge = options["max_edge"]
+        if max_edge and max(img_np.shape[:2]) > max_edge:
+            original_size = f"{img_np.shape[1]}x{img_np.shape[0]}"
+            img_np = downscale_image(img_np, max_edge)
+            print(f"[BespokeAI] Downscaled image from {original_size} to {img_np.shape[1]}x{img_np.shape[0]}")
+
+        self.array = img_np
+        return img_np
+
+    def key_params(self, options):
+        """Options that change what is uploaded, beyond the generation options."""
+        return {"image_format": options["image_format"]}
+
+    def image_data(self, options):
+        """Return the imageData sent to the API."""
+        image_format = options["image_format"]
+        data_url, stats = encode_image(self.array, image_format, options["png_compress_level"])
+        print(f"[BespokeAI] Encoded {self.array.shape[1]}x{self.array.shape[0]} {image_format.upper()}: "
+              f"{stats['payload_bytes'] / 1024:.0f} KB in {stats['encode_seconds'] * 1000:.0f} ms")
+        return data_url
+
+
+class FileInput(ImageInput):
+    """Input stage for an image file; relative paths are resolved against ComfyUI's input directory."""
+
+    def __init__(self, path):
+        super().__init__(None)
+        self.path = path
+
+    def load(self):
+        path = self.path
+        if not os.path.isabs(path):
+            path = os.path.join(folder_paths.get_input_directory(), path)
+        if not os.path.isfile(path):
+            raise ValueError(f"Image file not found: {path}")
+
+        # Decoded like ComfyUI's LoadImage, so the same picture shares cache entries with it
+        with Image.open(path) as pil_image:
+            return np.asarray(ImageOps.exif_transpose(pil_image).convert("RGB"))
 
-        return filepath
 
-    def generate_3d(self, image, api_key, resolution, with_texture, ai_enhancement,
-                    low_poly=False, segmentation=False, prompt="",
-                    poll_interval=5.0, max_poll_attempts=120):
-        """Main generation function."""
+class UrlInput:
+    """Input stage for a public image URL, which the API fetches itself."""
 
+    def __init__(self, url):
+        self.url = url
+
+    def prepare(self, options):
+        return self.url
+
+    def key_params(self, options):
+        return {}
+
+    def image_data(self, options):
+        return self.url
+
+
+class GenerationJob:
+    """
+    One generation going through the GenerationPipeline: its input stage,
+    options and progress sink, and the state left behind by each stage.
+    Submit nodes hand jobs to Await nodes as BESPOKEAI_TASK values.
+    """
+
+    def __init__(self, source, filename, options, pbar=None):
+        self.source = source
+        self.filename = filename
+        self.options = options
+        self.pbar = pbar
+        self.key = None
+        self.cache = None
+        # Set when the submit holds a slot and token from ApiLimiter.try_reserve()
+        self.reserved = False
+        # Future of a submit queued with submit_later()
+        self.submission = None
+        self.submit_response = None
+        self.result = None
+        self.outputs = None
+        self.timings = {}
+        self.metrics = {}
+        self.created = time.perf_counter()
+
+    @property
+    def task_id(self):
+        return (self.submit_response or {}).get("taskId", "")
+
+
+# .part file path -> [lock, number of downloads using it]
+_partial_locks = {}
+_partial_locks_lock = threading.Lock()
+
+
+@contextmanager
+def _partial_lock(part_path):
+    """Hold the lock of a .part file, so that only one download writes to it at a time."""
+    with _partial_locks_lock:
+        entry = _partial_locks.setdefault(part_path, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _partial_locks_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _partial_locks[part_path]
+
+
+class GenerationPipeline:
+    """
+    The generation engine shared by every BespokeAI node.
+    An input stage (ImageInput, FileInput or UrlInput) provides what the cache
+    key is computed from and the imageData to upload; every later stage -
+    result cache and single-flight, job journal, rate-limited submit,
+    background polling and streamed downloads - is the same for every input.
+    """
+
+    # Defaults of the optional node inputs
+    DEFAULTS = {
+        "low_poly": False,
+        "segmentation": False,
+        "prompt": "",
+        "poll_interval": 5.0,
+        "max_poll_attempts": 120,
+        "use_cache": True,
+        "image_format": "png",
+        "png_compress_level": 6,
+        "max_edge": 0,
+        "download_all": False,
+    }
+
+    # Upper bound on jobs of a batch that are in flight at the same time
+    MAX_BATCH_WORKERS = 64
+
+    def __init__(self, api_url):
+        self.api_url = api_url
+        self.model_dir = os.path.join(folder_paths.get_output_directory(), "bespokeai_3d")
+        os.makedirs(self.model_dir, exist_ok=True)
+        self.retry_policy = RetryPolicy()
+
+    def start(self, options):
+        """Validate the node inputs and open the progress bar. Returns (pbar, options)."""
+        options = dict(self.DEFAULTS, **options)
+
+        api_key = options.get("api_key")
         if not api_key or not api_key.strip():
             raise ValueError("API key is required. Get yours at https://bespokeai.build")
 
-        api_key = api_key.strip()
+        options["api_key"] = api_key.strip()
 
         # Create progress bar immediately when execution starts
         pbar = comfy.utils.ProgressBar(100)
@@ -187,46 +1562,598 @@ class BespokeAI3DGeneration:
         print("[BespokeAI] Starting 3D generation...")
 
         # Validate segmentation + resolution combo
-        if segmentation and resolution != "500k":
+        if options["segmentation"] and options["resolution"] != "500k":
             print("[BespokeAI] Warning: Segmentation only works with 500k resolution. Forcing 500k.")
-            resolution = "500k"
+            options["resolution"] = "500k"
 
-        # Convert image to base64 (2%)
-        print("[BespokeAI] Preparing image...")
-        pbar.update_absolute(2)
-        image_data = self.image_to_base64(image)
-        pbar.update_absolute(5)
+        return pbar, options
+
+    def jobs(self, sources, options, pbar):
+        """
+        Create one job per input stage, saving to model_<timestamp>[_<index>].glb
+        (with a numbered suffix if that name is taken when the job downloads).
+        """
+        timestamp = int(time.time())
+        if len(sources) == 1:
+            return [GenerationJob(sources[0], f"model_{timestamp}.glb", options, pbar)]
+        return [GenerationJob(source, f"model_{timestamp}_{index:03d}.glb", options, pbar)
+                for index, source in enumerate(sources)]
+
+    def outputs(self, results, pbar):
+        """Turn per-job output tuples into the node's list outputs."""
+        pbar.update_absolute(100)
+        print("[BespokeAI] 3D generation complete!")
+
+        return tuple(list(values) for values in zip(*results))
+
+    def map(self, fn, jobs, pbar, name="batch"):
+        """Run fn(job) for every job concurrently, returning the results in order.
+
+        Progress is reported as the mean of all jobs, and failures are raised
+        only once every job has settled so that paid generations which did
+        succeed still end up on disk.
+        """
+        if len(jobs) == 1:
+            jobs[0].pbar = pbar
+            return [fn(jobs[0])]
+
+        progress = [0] * len(jobs)
+        for index, job in enumerate(jobs):
+            job.pbar = _ItemProgress(progress, index)
+
+        with ThreadPoolExecutor(max_workers=min(len(jobs), self.MAX_BATCH_WORKERS),
+                                thread_name_prefix=f"bespokeai-{name}") as pool:
+            futures = [pool.submit(fn, job) for job in jobs]
+
+            pending = set(futures)
+            while pending:
+                _, pending = wait(pending, timeout=1.0)
+                pbar.update_absolute(int(sum(progress) / len(progress)))
+
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+
+        return self._collect_results(outcomes)
+
+    async def map_async(self, fn, jobs, pbar):
+        """Asynchronous counterpart of map, for coroutine functions."""
+        progress = [0] * len(jobs)
+        for index, job in enumerate(jobs):
+            job.pbar = _ItemProgress(progress, index)
+
+        runs = asyncio.gather(*(fn(job) for job in jobs), return_exceptions=True)
+
+        while True:
+            done, _ = await asyncio.wait({runs}, timeout=1.0)
+            pbar.update_absolute(int(sum(progress) / len(progress)))
+            if done:
+                break
+
+        return self._collect_results(runs.result())
+
+    def _collect_results(self, outcomes):
+        """Return per-job results, raising one error that lists every failed job."""
+        errors = [f"image {index}: {outcome}" for index, outcome in enumerate(outcomes)
+                  if isinstance(outcome, BaseException)]
+
+        if errors:
+            if len(outcomes) == 1:
+                raise outcomes[0]
+            raise RuntimeError(f"{len(errors)} of {len(outcomes)} batch generations failed: " + "; ".join(errors))
+
+        return outcomes
+
+    def run(self, job):
+        """Take a job through every stage. Returns its output tuple."""
+        if self.prepare(job):
+            return job.outputs
+
+        if job.cache:
+            # Concurrent executions with the same inputs share one submitted task
+            return _generation_flights.do(self._flight_key(job), lambda: self._submit_and_finish(job))
+        return self._submit_and_finish(job)
+
+    async def run_async(self, job):
+        """
+        Asynchronous counterpart of run. Waiting for the API never blocks the
+        event loop: polling completes through the background poller's futures,
+        and blocking prepare/submit/download stages run in worker threads.
+        """
+        if await asyncio.to_thread(self.prepare, job):
+            return job.outputs
+
+        if job.cache:
+            return await _generation_flights.do_async(self._flight_key(job),
+                                                      lambda: self._submit_and_finish_async(job))
+        return await self._submit_and_finish_async(job)
+
+    @staticmethod
+    def _flight_key(job):
+        return (job.key, job.options["download_all"])
+
+    def _submit_and_finish(self, job):
+        self.submit(job)
+        return self.finish(job)
+
+    async def _submit_and_finish_async(self, job):
+        await asyncio.get_running_loop().run_in_executor(get_submit_executor(), self.submit, job)
+        return await self.finish_async(job)
+
+    def prepare(self, job):
+        """
+        Run the job's input stage and look it up in the result cache.
+        Returns True on a cache hit, in which case job.outputs is set.
+        """
+        options = job.options
+        job.pbar.update_absolute(2)
+
+        with self._stage("prepare", job):
+            key_source = job.source.prepare(options)
+
+            job.cache = get_result_cache(self.model_dir) if options["use_cache"] else None
+            job.key = compute_cache_key(key_source, {
+                "resolution": options["resolution"],
+                "with_texture": options["with_texture"],
+                "ai_enhancement": options["ai_enhancement"],
+                "low_poly": options["low_poly"],
+                "segmentation": options["segmentation"],
+                "prompt": options["prompt"].strip() if options["prompt"] else "",
+                **job.source.key_params(options),
+            })
+
+            cached = job.cache.get(job.key) if job.cache else None
+
+        # An entry holding only the GLB cannot satisfy a download_all request
+        if cached and (cached.get("complete_set") or not options["download_all"]):
+            print(f"[BespokeAI] Cache hit, reusing previous result: {cached['mesh_path'] or cached['model_url']}")
+            job.pbar.update_absolute(100)
+            files = cached.get("files") or ({"glb": [cached["mesh_path"]]} if cached["mesh_path"] else {})
+            job.outputs = (cached["mesh_path"], cached["model_url"], cached["enhanced_image_url"],
+                           files.get("obj", [""])[0], json.dumps(files))
+            generation_metrics.record(job, "cached")
+
+        return job.outputs is not None
+
+    def submit(self, job):
+        """
+        Submit the job, or resume an unfinished journaled task with the same
+        inputs instead, and start polling it in the background.
+        """
+        options = job.options
+        journal = get_job_journal(self.model_dir)
+
+        try:
+            resumed = journal.claim(job.key)
+            if resumed:
+                print(f"[BespokeAI] Resuming unfinished task {resumed['task_id']} instead of resubmitting")
+                job.submit_response = {"taskId": resumed["task_id"],
+                                       "enhancedImageUrl": resumed.get("enhanced_image_url", "")}
+            elif job.cache:
+                # Executions with the same inputs share one task, including one
+                # another execution (e.g. a Submit node) has already submitted
+                job.submit_response = _submission_flights.do(job.key, lambda: self._submit_or_share(job, journal))
+            else:
+                job.submit_response = self._submit_journaled(job, journal)
+        finally:
+            if job.reserved:
+                # Not used by a submit request (resumed or shared task, or a failed encode)
+                job.reserved = False
+                get_api_limiter().release_slot()
+
+        get_task_poller().track(self.api_url, options["api_key"], job.task_id, options["segmentation"],
+                                options["poll_interval"], options["max_poll_attempts"])
+
+    def submit_later(self, job):
+        """Queue submit(job) on the submit executor; finish() waits for it."""
+        print("[BespokeAI] API limits reached, submission queued")
+        job.submission = get_submit_executor().submit(self.submit, job)
+
+    def _submit_or_share(self, job, journal):
+        shared = journal.active(job.key)
+        if shared:
+            print(f"[BespokeAI] Identical task {shared['task_id']} already in flight, sharing it")
+            return {"taskId": shared["task_id"], "enhancedImageUrl": shared.get("enhanced_image_url", "")}
+        return self._submit_journaled(job, journal)
+
+    def _submit_journaled(self, job, journal):
+        """Submit the job and record the task in the journal. Returns the submit response."""
+        try:
+            submit_response = self._submit(job)
+        except Exception:
+            generation_metrics.record(job, "failed")
+            raise
+        journal.submitted(job.key, submit_response.get("taskId", ""), submit_response.get("enhancedImageUrl", ""))
+        return submit_response
+
+    def _submit(self, job):
+        """Produce the imageData from the input stage and submit it. Returns the submit response."""
+        options = job.options
+
+        with self._stage("encode", job):
+            image_data = job.source.image_data(options)
+        job.metrics["payload_bytes"] = len(image_data)
+        job.pbar.update_absolute(5)
 
         # Submit generation request (5-10%)
         print("[BespokeAI] Submitting 3D generation request...")
-        submit_response = self.submit_generation(
-            api_key=api_key,
-            image_data=image_data,
-            resolution=resolution,
-            with_texture=with_texture,
-            ai_enhancement=ai_enhancement,
-            low_poly=low_poly,
-            segmentation=segmentation,
-            prompt=prompt
-        )
-        pbar.update_absolute(10)
+        reserved, job.reserved = job.reserved, False
+        with self._stage("submit", job):
+            submit_response = self.submit_generation(
+                api_key=options["api_key"],
+                image_data=image_data,
+                resolution=options["resolution"],
+                with_texture=options["with_texture"],
+                ai_enhancement=options["ai_enhancement"],
+                low_poly=options["low_poly"],
+                segmentation=options["segmentation"],
+                prompt=options["prompt"],
+                stats=job.metrics,
+                reserved=reserved
+            )
+        job.pbar.update_absolute(10)
 
         task_id = submit_response.get("taskId")
         credits_used = submit_response.get("creditsUsed", 0)
-        enhanced_image_url = submit_response.get("enhancedImageUrl", "")
 
         print(f"[BespokeAI] Task submitted: {task_id} (Credits used: {credits_used})")
 
-        # Poll for completion (10-90%)
-        print("[BespokeAI] Generating 3D model (this may take a few minutes)...")
-        result = self.poll_task(
-            api_key=api_key,
-            task_id=task_id,
-            segmentation=segmentation,
-            poll_interval=poll_interval,
-            max_attempts=max_poll_attempts,
-            pbar=pbar
-        )
+        return submit_response
+
+    def finish(self, job):
+        """Wait for a submitted job and download its results. Returns its output tuple."""
+        if job.outputs is not None:
+            job.pbar.update_absolute(100)
+            return job.outputs
+
+        if job.submission is not None:
+            job.submission.result()
+
+        with self._recording(job), get_job_journal(self.model_dir).running(job.task_id):
+            # Poll for completion (10-90%)
+            print("[BespokeAI] Generating 3D model (this may take a few minutes)...")
+            with self._stage("poll", job):
+                job.result = self.poll_task(job)
+
+            return self._download_shared(job)
+
+    async def finish_async(self, job):
+        """Asynchronous counterpart of finish."""
+        if job.outputs is not None:
+            job.pbar.update_absolute(100)
+            return job.outputs
+
+        if job.submission is not None:
+            await asyncio.wrap_future(job.submission)
+
+        with self._recording(job), get_job_journal(self.model_dir).running(job.task_id):
+            print("[BespokeAI] Generating 3D model (this may take a few minutes)...")
+            with self._stage("poll", job):
+                job.result = await self.poll_task_async(job)
+
+            return await asyncio.to_thread(self._download_shared, job)
+
+    def _download_shared(self, job):
+        """download_result, with jobs sharing a task (e.g. from Submit nodes) sharing one download."""
+        job.outputs = _download_flights.do((job.task_id, job.options["download_all"]),
+                                           lambda: self.download_result(job))
+        return job.outputs
+
+    @staticmethod
+    @contextmanager
+    def _recording(job):
+        """Record the job in generation_metrics once it finishes, successfully or not."""
+        try:
+            yield
+        except BaseException:
+            generation_metrics.record(job, "failed")
+            raise
+        generation_metrics.record(job, "done")
+
+    @contextmanager
+    def _stage(self, stage, job):
+        """Time a pipeline stage, adding it to job.timings and reporting it to the stage hooks."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            job.timings[stage] = job.timings.get(stage, 0.0) + seconds
+            for hook in list(_stage_hooks):
+                try:
+                    hook(stage, seconds, job)
+                except Exception as e:
+                    print(f"[BespokeAI] Stage hook failed: {e}")
+
+    def submit_generation(self, api_key, image_data, resolution, with_texture,
+                          ai_enhancement, low_poly, segmentation, prompt, stats=None, reserved=False):
+        """
+        Submit 3D generation request to BespokeAI API.
+        If a stats dict is given, the time spent waiting for the rate limiter
+        and the latency of the final request are stored in it. With reserved,
+        the caller already holds a slot and a token from ApiLimiter.try_reserve().
+        """
+        stats = {} if stats is None else stats
+        stats["queue_wait_seconds"] = 0.0
+        headers = {
+            "Content-Type": "application/json",
+            "X-API-Key": api_key,
+            # Shared by every retry of this submit so the API can deduplicate them
+            "Idempotency-Key": uuid.uuid4().hex,
+        }
+
+        payload = {
+            "imageData": image_data,
+            "resolution": resolution,
+            "withTexture": with_texture,
+            "aiEnhancement": ai_enhancement,
+            "lowPoly": low_poly,
+            "segmentation": segmentation,
+        }
+
+        if prompt and prompt.strip():
+            payload["prompt"] = prompt.strip()
+
+        limiter = get_api_limiter()
+        start = time.perf_counter()
+        if not reserved:
+            limiter.acquire_slot()
+        stats["queue_wait_seconds"] += time.perf_counter() - start
+        try:
+            rate_limited = 0
+            failures = 0
+            while True:
+                start = time.perf_counter()
+                if reserved:
+                    reserved = False  # Only the first request uses the reserved token
+                else:
+                    limiter.submits.acquire()
+                stats["queue_wait_seconds"] += time.perf_counter() - start
+                try:
+                    start = time.perf_counter()
+                    response = get_http_session().post(self.api_url, headers=headers, json=payload, timeout=60)
+                    stats["submit_seconds"] = time.perf_counter() - start
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if failures >= self.retry_policy.retries or not (IDEMPOTENT_SUBMIT or RetryPolicy.never_sent(e)):
+                        raise
+                    failures += 1
+                    delay = self.retry_policy.delay(failures)
+                    print(f"[BespokeAI] Submit failed ({e}), retrying in {delay:.1f}s...")
+                    time.sleep(delay)
+                    continue
+
+                if response.status_code == 429 and rate_limited < RATE_LIMIT_RETRIES:
+                    # Stop every submitter until the server is ready again, not only this one
+                    delay = parse_retry_after(response.headers.get("Retry-After"))
+                    if delay is None:
+                        delay = min(2 ** rate_limited, POLL_MAX_INTERVAL) * random.uniform(1.0, 1.5)
+                    rate_limited += 1
+                    print(f"[BespokeAI] Rate limited on submit, retrying in {delay:.1f}s...")
+                    limiter.submits.pause(delay)
+                    continue
+
+                if response.status_code >= 500 and IDEMPOTENT_SUBMIT and failures < self.retry_policy.retries:
+                    failures += 1
+                    delay = self.retry_policy.delay(failures, parse_retry_after(response.headers.get("Retry-After")))
+                    print(f"[BespokeAI] Submit failed with status {response.status_code}, "
+                          f"retrying in {delay:.1f}s...")
+                    time.sleep(delay)
+                    continue
+
+                break
+
+            if response.status_code == 401:
+                raise ValueError("Invalid API key. Please check your BespokeAI API key.")
+            elif response.status_code == 402:
+                raise ValueError("Insufficient credits. Please add more credits to your BespokeAI account.")
+            elif response.status_code == 429:
+                raise ValueError("Rate limit exceeded. Please wait before making more requests.")
+            elif response.status_code == 400:
+                error_data = response.json()
+                raise ValueError(f"Invalid request: {error_data.get('error', 'Unknown error')}")
+            elif not response.ok:
+                raise RuntimeError(f"API request failed with status {response.status_code}: {response.text}")
+
+            submit_response = response.json()
+            task_id = submit_response.get("taskId")
+        except BaseException:
+            limiter.release_slot()
+            raise
+
+        if task_id:
+            limiter.hold_slot(task_id)
+        else:
+            limiter.release_slot()
+
+        return submit_response
+
+    def poll_task(self, job):
+        """Wait for a job's task on the shared background poller, with progress updates."""
+        task = self._track(job)
+
+        # Wait in slices rather than with result(timeout=...): the task itself may
+        # fail with TimeoutError, which must not be mistaken for the slice expiring
+        while not wait([task.future], timeout=1.0).done:
+            self._report_poll_progress(task, job.pbar)
+
+        self._record_poll(task, job)
+        return task.future.result()
+
+    async def poll_task_async(self, job):
+        """Await a job's task on the shared background poller without blocking the event loop."""
+        task = self._track(job)
+        future = asyncio.wrap_future(task.future)
+
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=1.0)
+            if done:
+                self._record_poll(task, job)
+                return future.result()
+            self._report_poll_progress(task, job.pbar)
+
+    @staticmethod
+    def _record_poll(task, job):
+        job.metrics["poll_count"] = task.requests
+        job.metrics["server_seconds"] = task.finished - task.started
+
+    def _track(self, job):
+        options = job.options
+        return get_task_poller().track(self.api_url, options["api_key"], job.task_id, options["segmentation"],
+                                       options["poll_interval"], options["max_poll_attempts"])
+
+    @staticmethod
+    def _report_poll_progress(task, pbar):
+        if not pbar:
+            return
+        if task.status == "processing":
+            # Update progress bar - reserve 10-90% for processing, 90-100% for download
+            if task.progress > 0:
+                pbar.update_absolute(10 + int(task.progress * 0.8))
+        elif task.attempts > 0:
+            # Unknown status - still increment progress slightly to show activity
+            pbar.update_absolute(10 + min(task.attempts * 2, 70))
+
+    def reserve_filename(self, filename):
+        """
+        Claim an unused name in the output directory: filename, or filename with
+        a numbered suffix if it is taken. The file is created empty and
+        exclusively, so no other job or process can claim the same name; the
+        download then replaces it.
+        """
+        stem, ext = os.path.splitext(filename)
+        for number in itertools.count():
+            name = f"{stem}_{number}{ext}" if number else filename
+            try:
+                fd = os.open(os.path.join(self.model_dir, name), os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+            except FileExistsError:
+                continue
+            os.close(fd)
+            return name
+
+    def download_file(self, url, filename, chunk_size=None):
+        """
+        Download a file from URL to the output directory.
+        The body is streamed in fixed-size chunks to a .part file that is
+        renamed into place once complete. If the transfer is interrupted, the
+        .part file and its journal are kept and the download resumes from the
+        received byte count, on retry or on a later run for the same URL.
+        """
+        filepath = os.path.join(self.model_dir, filename)
+        chunk_size = chunk_size or DOWNLOAD_CHUNK_SIZE
+        part_path, journal_path = self._partial_paths(url)
+
+        # A second download of the same URL waits, then starts over on its own
+        with _partial_lock(part_path):
+            for attempt in range(DOWNLOAD_RETRIES + 1):
+                try:
+                    self._download_part(url, part_path, journal_path, chunk_size)
+                    break
+                except Exception as e:
+                    if not RetryPolicy.is_transient(e) or attempt == DOWNLOAD_RETRIES:
+                        raise
+                    received = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+                    print(f"[BespokeAI] Download interrupted after {received} bytes ({e}), resuming...")
+                    time.sleep(self.retry_policy.delay(attempt + 1))
+
+            os.replace(part_path, filepath)
+            os.remove(journal_path)
+
+        return filepath
+
+    def _partial_paths(self, url):
+        """Return the .part file and journal paths for a download URL.
+
+        Partial files are keyed on the full URL: result URLs of one task may
+        differ only in their query string (e.g. /download?file=model.obj).
+        """
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:20]
+        partial_dir = os.path.join(self.model_dir, ".partial")
+        os.makedirs(partial_dir, exist_ok=True)
+        part_path = os.path.join(partial_dir, f"{key}.part")
+        return part_path, part_path + ".json"
+
+    def _download_part(self, url, part_path, journal_path, chunk_size):
+        """Fetch the missing bytes of a download into its .part file."""
+        journal = {}
+        if os.path.exists(journal_path) and os.path.exists(part_path):
+            try:
+                with open(journal_path, "r", encoding="utf-8") as f:
+                    journal = json.load(f)
+            except (OSError, ValueError):
+                journal = {}
+            if journal.get("url") != url:
+                # Left behind by another download whose key hashed the same
+                journal = {}
+
+        offset = os.path.getsize(part_path) if journal else 0
+        headers = {}
+        if offset > 0:
+            headers["Range"] = f"bytes={offset}-"
+            # Only resume if the remote file is still the one we started on
+            validator = journal.get("etag") or journal.get("last_modified")
+            if validator and not validator.startswith("W/"):
+                headers["If-Range"] = validator
+
+        with get_http_session().get(url, headers=headers, timeout=120, stream=True) as response:
+            if response.status_code == 416 and offset and offset == journal.get("total"):
+                return
+
+            response.raise_for_status()
+
+            if offset and response.status_code == 206:
+                mode = "ab"
+                print(f"[BespokeAI] Resuming download at byte {offset}")
+            else:
+                # Server ignored the Range header or the file changed: start over
+                mode = "wb"
+                offset = 0
+
+            length = response.headers.get("Content-Length")
+            journal = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "total": offset + int(length) if length and length.isdigit() else None,
+                "received": offset,
+            }
+            self._write_journal(journal_path, journal)
+
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    journal["received"] += len(chunk)
+                    if journal["received"] - offset >= 16 * chunk_size:
+                        f.flush()
+                        offset = journal["received"]
+                        self._write_journal(journal_path, journal)
+
+            self._write_journal(journal_path, journal)
+
+        if journal["total"] is not None and journal["received"] < journal["total"]:
+            raise requests.exceptions.ChunkedEncodingError(
+                f"received {journal['received']} of {journal['total']} bytes")
+
+    @staticmethod
+    def _write_journal(journal_path, journal):
+        tmp_path = journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(journal, f)
+        os.replace(tmp_path, journal_path)
+
+    def download_result(self, job):
+        """
+        Download the GLB of a completed job (or, with download_all, every result
+        file and the enhanced image, concurrently) and store the result in the
+        job's cache if any. Returns (mesh_path, model_url, enhanced_image_url,
+        obj_path, result_files) where result_files is a JSON object mapping each
+        file type to its local paths.
+        """
+        result, pbar = job.result, job.pbar
+        download_all = job.options["download_all"]
+        enhanced_image_url = job.submit_response.get("enhancedImageUrl", "")
 
         # Extract file URLs (90%)
         pbar.update_absolute(90)
@@ -245,20 +2172,613 @@ class BespokeAI3DGeneration:
         if not glb_url and model_url:
             glb_url = model_url
 
-        # Download GLB file (90-100%)
-        timestamp = int(time.time())
-        mesh_path = ""
+        # Claimed only now, so that jobs finishing at the same time never share
+        # (and overwrite) an output file
+        filename = self.reserve_filename(job.filename)
 
+        # (type, url, local filename) of every file to fetch, the main GLB first
+        downloads = []
         if glb_url:
-            print("[BespokeAI] Downloading GLB file...")
-            pbar.update_absolute(95)
-            mesh_path = self.download_file(glb_url, f"model_{timestamp}.glb")
-            print(f"[BespokeAI] GLB saved: {mesh_path}")
+            downloads.append(("glb", glb_url, filename))
+
+        if download_all:
+            stem = os.path.splitext(filename)[0]
+            used_names = {filename}
+            for file_info in result_files:
+                url = file_info.get("Url", "")
+                file_type = file_info.get("Type", "file").lower() or "file"
+                if not url or url == glb_url:
+                    continue
+                ext = os.path.splitext(urlsplit(url).path)[1] or f".{file_type}"
+                name = f"{stem}{ext}"
+                if name in used_names:
+                    name = f"{stem}_{file_type}_{len(used_names)}{ext}"
+                used_names.add(name)
+                downloads.append((file_type, url, name))
+
+            if enhanced_image_url:
+                ext = os.path.splitext(urlsplit(enhanced_image_url).path)[1] or ".png"
+                downloads.append(("enhanced_image", enhanced_image_url, f"{stem}_enhanced{ext}"))
+
+        # Download files (90-100%)
+        files = {}
+
+        paths = None
+        try:
+            if downloads:
+                print(f"[BespokeAI] Downloading {len(downloads)} file(s)...")
+                pbar.update_absolute(95)
+                with self._stage("download", job):
+                    paths = self._download_files(downloads)
+        finally:
+            if paths is None or not glb_url:
+                # Give the name back unless the GLB was downloaded into it
+                reserved = os.path.join(self.model_dir, filename)
+                if os.path.exists(reserved) and os.path.getsize(reserved) == 0:
+                    os.remove(reserved)
+
+        if downloads:
+            job.metrics["download_seconds"] = job.timings["download"]
+            job.metrics["download_bytes"] = sum(os.path.getsize(path) for path in paths)
+            for (file_type, _, _), path in zip(downloads, paths):
+                files.setdefault(file_type, []).append(path)
+                print(f"[BespokeAI] {file_type.upper()} saved: {path}")
+
+        mesh_path = files["glb"][0] if glb_url else ""
+        obj_path = files.get("obj", [""])[0]
+
+        if job.cache:
+            job.cache.put(job.key, mesh_path, model_url, enhanced_image_url, files, complete_set=download_all)
 
         pbar.update_absolute(100)
-        print("[BespokeAI] 3D generation complete!")
 
-        return (mesh_path, model_url, enhanced_image_url)
+        job.outputs = (mesh_path, model_url, enhanced_image_url, obj_path, json.dumps(files))
+        return job.outputs
+
+    def _download_files(self, downloads):
+        """Download (type, url, filename) entries on a bounded thread pool, returning paths in order."""
+        if len(downloads) == 1:
+            return [self.download_file(downloads[0][1], downloads[0][2])]
+
+        with ThreadPoolExecutor(max_workers=min(len(downloads), DOWNLOAD_WORKERS),
+                                thread_name_prefix="bespokeai-download") as pool:
+            return list(pool.map(lambda download: self.download_file(download[1], download[2]), downloads))
+
+
+# Model placement for the preview node. Generated models are made visible in
+# input/3d without duplicating their bytes where the filesystem allows it: a
+# copy-on-write clone (reflink) first, then a hardlink, then a symlink, and a
+# full copy only when none of those work (e.g. across filesystems on Windows).
+# BESPOKEAI_PREVIEW_PLACEMENT sets the methods to try, in order.
+PLACEMENT_METHODS = [
+    method.strip() for method in
+    os.environ.get("BESPOKEAI_PREVIEW_PLACEMENT", "reflink,hardlink,symlink,copy").lower().split(",")
+    if method.strip()
+]
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Linux FICLONE ioctl, supported by Btrfs, XFS and other copy-on-write filesystems
+FICLONE = 0x40049409
+
+
+def _reflink(src, dest):
+    if fcntl is None or not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported on this platform")
+    with open(src, "rb") as src_file, open(dest, "wb") as dest_file:
+        fcntl.ioctl(dest_file.fileno(), FICLONE, src_file.fileno())
+
+
+PLACEMENT_FUNCTIONS = {
+    "reflink": _reflink,
+    "hardlink": os.link,
+    "symlink": lambda src, dest: os.symlink(os.path.abspath(src), dest),
+    "copy": shutil.copy2,
+}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# File fingerprints for the preview node's IS_CHANGED, which runs on every
+# queue. "stat" (the default) uses size and mtime, never reading the file.
+# "hash" streams the file through SHA-256 once per inode and reuses the digest
+# until the size or mtime changes, also catching rewrites that keep both.
+PREVIEW_FINGERPRINT = os.environ.get("BESPOKEAI_PREVIEW_FINGERPRINT", "stat").lower()
+# Digests kept, least recently used evicted first
+FILE_DIGEST_CACHE_SIZE = 1024
+
+# (device, inode) -> ((size, mtime_ns), sha256)
+_file_digests = OrderedDict()
+_file_digests_lock = threading.Lock()
+
+
+def file_digest(path):
+    """SHA-256 of a file, cached per inode while its size and mtime are unchanged."""
+    stat = os.stat(path)
+    inode = (stat.st_dev, stat.st_ino)
+    version = (stat.st_size, stat.st_mtime_ns)
+    with _file_digests_lock:
+        cached = _file_digests.get(inode)
+        if cached is not None and cached[0] == version:
+            _file_digests.move_to_end(inode)
+            return cached[1]
+
+    digest = file_sha256(path)
+    with _file_digests_lock:
+        _file_digests[inode] = (version, digest)
+        _file_digests.move_to_end(inode)
+        while len(_file_digests) > FILE_DIGEST_CACHE_SIZE:
+            _file_digests.popitem(last=False)
+    return digest
+
+
+def file_fingerprint(path, mode=None):
+    """A string that changes exactly when the content of path does (see PREVIEW_FINGERPRINT)."""
+    if (mode or PREVIEW_FINGERPRINT) == "stat":
+        stat = os.stat(path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    return file_digest(path)
+
+
+def place_file(src, dest, methods=None):
+    """
+    Make src available at dest, returning the method used.
+    Nothing is done ("same") when dest already is src, or ("identical") holds
+    the same bytes. Otherwise each placement method is tried in turn on a
+    temporary name that atomically replaces dest, falling back to a copy.
+    """
+    if os.path.exists(dest):
+        if os.path.samefile(src, dest):
+            return "same"
+        if os.path.getsize(src) == os.path.getsize(dest) and file_digest(src) == file_digest(dest):
+            return "identical"
+
+    methods = methods or PLACEMENT_METHODS
+    if "copy" not in methods:
+        methods = list(methods) + ["copy"]
+
+    temp_path = f"{dest}.{uuid.uuid4().hex}.tmp"
+    try:
+        for method in methods:
+            place = PLACEMENT_FUNCTIONS.get(method)
+            if place is None:
+                continue
+            try:
+                place(src, temp_path)
+            except OSError:
+                if method == "copy":
+                    raise
+                if os.path.lexists(temp_path):
+                    os.remove(temp_path)
+                continue
+            os.replace(temp_path, dest)
+            return method
+    finally:
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+
+
+# GLB reader. Binary glTF files are memory-mapped: the JSON chunk is parsed
+# and accessors are exposed as read-only NumPy views into the BIN chunk, so
+# inspecting a large mesh reads only the pages that are actually touched.
+GLB_MAGIC = b"glTF"
+GLB_CHUNK_JSON = 0x4E4F534A
+GLB_CHUNK_BIN = 0x004E4942
+GLTF_COMPONENT_TYPES = {
+    5120: np.int8,
+    5121: np.uint8,
+    5122: np.int16,
+    5123: np.uint16,
+    5125: np.uint32,
+    5126: np.float32,
+}
+GLTF_TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+
+
+class GLBReader:
+    """
+    Memory-mapped reader for .glb files.
+    Arrays returned by accessor() and the attribute helpers are views into
+    the mapped file and stay valid after close(); the mapping is released once
+    the last view is gone.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self.gltf, self._bin_offset, self._bin_length = self._parse()
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _parse(self):
+        data = self._mmap
+        if len(data) < 20 or data[:4] != GLB_MAGIC:
+            raise ValueError(f"{self.path} is not a GLB file")
+        version, length = struct.unpack_from("<II", data, 4)
+        if version != 2:
+            raise ValueError(f"Unsupported GLB version {version}")
+        length = min(length, len(data))
+
+        gltf, bin_offset, bin_length = None, None, 0
+        offset = 12
+        while offset + 8 <= length:
+            chunk_length, chunk_type = struct.unpack_from("<II", data, offset)
+            start = offset + 8
+            if start + chunk_length > length:
+                raise ValueError(f"Truncated GLB chunk at byte {offset}")
+            if chunk_type == GLB_CHUNK_JSON and gltf is None:
+                gltf = json.loads(data[start:start + chunk_length])
+            elif chunk_type == GLB_CHUNK_BIN and bin_offset is None:
+                bin_offset, bin_length = start, chunk_length
+            # Chunks are 4-byte aligned
+            offset = start + (chunk_length + 3) // 4 * 4
+
+        if gltf is None:
+            raise ValueError(f"{self.path} has no JSON chunk")
+        return gltf, bin_offset, bin_length
+
+    def close(self):
+        # Arrays reference the mmap object without holding a buffer export, so
+        # mmap.close() would unmap memory they still point to. Dropping our
+        # reference instead unmaps the file as soon as the last view is gone.
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def accessor(self, index):
+        """Accessor `index` as an array of shape (count,) or (count, components)."""
+        if self._mmap is None:
+            raise ValueError(f"{self.path} is closed")
+        accessor = self.gltf["accessors"][index]
+        if "sparse" in accessor:
+            raise ValueError(f"Sparse accessor {index} is not supported")
+        dtype = np.dtype(GLTF_COMPONENT_TYPES[accessor["componentType"]]).newbyteorder("<")
+        components = GLTF_TYPE_SIZES[accessor["type"]]
+        count = accessor["count"]
+        shape = (count,) if components == 1 else (count, components)
+
+        if "bufferView" not in accessor:
+            return np.zeros(shape, dtype)
+
+        view = self.gltf["bufferViews"][accessor["bufferView"]]
+        if view.get("buffer", 0) != 0 or "uri" in self.gltf["buffers"][view.get("buffer", 0)]:
+            raise ValueError(f"Accessor {index} does not reference the GLB binary chunk")
+        if self._bin_offset is None:
+            raise ValueError(f"{self.path} has no BIN chunk")
+
+        element_size = dtype.itemsize * components
+        stride = view.get("byteStride") or element_size
+        start = view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+        end = start + stride * (count - 1) + element_size if count else start
+        if end > min(view.get("byteOffset", 0) + view["byteLength"], self._bin_length):
+            raise ValueError(f"Accessor {index} reads past the end of its buffer view")
+
+        strides = (stride,) if components == 1 else (stride, dtype.itemsize)
+        return np.ndarray(shape, dtype, buffer=self._mmap, offset=self._bin_offset + start, strides=strides)
+
+    def primitives(self):
+        """Every (mesh index, primitive) pair of the file."""
+        for mesh_index, mesh in enumerate(self.gltf.get("meshes", [])):
+            for primitive in mesh.get("primitives", []):
+                yield mesh_index, primitive
+
+    def attribute(self, name, mesh=0, primitive=0):
+        """A vertex attribute (e.g. "POSITION", "NORMAL", "TEXCOORD_0") of one primitive, or None."""
+        attributes = self.gltf["meshes"][mesh]["primitives"][primitive].get("attributes", {})
+        return self.accessor(attributes[name]) if name in attributes else None
+
+    def positions(self, mesh=0, primitive=0):
+        return self.attribute("POSITION", mesh, primitive)
+
+    def normals(self, mesh=0, primitive=0):
+        return self.attribute("NORMAL", mesh, primitive)
+
+    def uvs(self, mesh=0, primitive=0, channel=0):
+        return self.attribute(f"TEXCOORD_{channel}", mesh, primitive)
+
+    def indices(self, mesh=0, primitive=0):
+        """Index array of one primitive, or None for non-indexed geometry."""
+        index = self.gltf["meshes"][mesh]["primitives"][primitive].get("indices")
+        return self.accessor(index) if index is not None else None
+
+    def vertex_count(self):
+        """Vertices of all meshes, counting each POSITION accessor once."""
+        accessors = self.gltf.get("accessors", [])
+        positions = {primitive["attributes"]["POSITION"] for _, primitive in self.primitives()
+                     if "POSITION" in primitive.get("attributes", {})}
+        return sum(accessors[index].get("count", 0) for index in positions if index < len(accessors))
+
+    def triangle_count(self):
+        """Triangles of all triangle-list primitives (mode 4, the default)."""
+        accessors = self.gltf.get("accessors", [])
+        triangles = 0
+        for _, primitive in self.primitives():
+            if primitive.get("mode", 4) != 4:
+                continue
+            if "indices" in primitive:
+                triangles += accessors[primitive["indices"]].get("count", 0) // 3
+            elif "POSITION" in primitive.get("attributes", {}):
+                triangles += accessors[primitive["attributes"]["POSITION"]].get("count", 0) // 3
+        return triangles
+
+
+# Model index for the preview node. Listing input/3d on every node definition
+# request stalls the UI with many models, so the recursive listing is cached
+# per directory and only directories whose mtime changed are rescanned. Size,
+# vertex count and thumbnail of a model are read on demand and cached until
+# the file changes; GET /bespokeai/model-index?details=1 returns them.
+MODEL_EXTENSIONS = (".glb", ".gltf", ".obj", ".fbx", ".stl")
+THUMBNAIL_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+# Directory mtimes this recent are not trusted yet, since an entry added within
+# the filesystem's timestamp granularity would not change them again
+INDEX_SETTLE_SECONDS = 2.0
+
+
+def glb_vertex_count(path):
+    """Vertex count of a GLB (sum of its POSITION accessors)."""
+    with GLBReader(path) as glb:
+        return glb.vertex_count()
+
+
+def obj_vertex_count(path):
+    with open(path, "rb") as f:
+        return sum(1 for line in f if line.startswith(b"v "))
+
+
+VERTEX_COUNTERS = {
+    ".glb": glb_vertex_count,
+    ".obj": obj_vertex_count,
+}
+
+
+class ModelIndex:
+    """Cached, incrementally refreshed recursive listing of the model files under root."""
+
+    def __init__(self, root, extensions=MODEL_EXTENSIONS):
+        self.root = root
+        self.extensions = extensions
+        # Relative directory ("" for root) -> (mtime_ns or None, files, subdirectories)
+        self._dirs = {}
+        self._files = []
+        # Relative path -> ((size, mtime_ns), details)
+        self._details = {}
+        self._lock = threading.Lock()
+
+    def files(self):
+        """Sorted model paths relative to root, with "/" separators."""
+        with self._lock:
+            if self._refresh():
+                self._files = sorted(path for _, files, _ in self._dirs.values() for path in files)
+                self._details = {path: self._details[path] for path in self._files if path in self._details}
+            return list(self._files)
+
+    def _refresh(self):
+        """Rescan the directories that changed, returning whether any did."""
+        changed = False
+        seen = set()
+        pending = [""]
+        while pending:
+            relative_dir = pending.pop()
+            path = os.path.join(self.root, *relative_dir.split("/")) if relative_dir else self.root
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            seen.add(relative_dir)
+
+            entry = self._dirs.get(relative_dir)
+            if entry is None or entry[0] is None or entry[0] != mtime:
+                settled = time.time() - mtime / 1e9 > INDEX_SETTLE_SECONDS
+                files, subdirs = self._scan(relative_dir, path)
+                if entry is None or (entry[1], entry[2]) != (files, subdirs):
+                    changed = True
+                entry = (mtime if settled else None, files, subdirs)
+                self._dirs[relative_dir] = entry
+            pending.extend(entry[2])
+
+        for relative_dir in set(self._dirs) - seen:
+            del self._dirs[relative_dir]
+            changed = True
+        return changed
+
+    def _scan(self, relative_dir, path):
+        files, subdirs = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                    try:
+                        if entry.is_dir():
+                            subdirs.append(relative_path)
+                        elif entry.name.lower().endswith(self.extensions):
+                            files.append(relative_path)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return sorted(files), sorted(subdirs)
+
+    def details(self, relative_path):
+        """Size, mtime, vertex count and thumbnail of one indexed model."""
+        path = os.path.join(self.root, *relative_path.split("/"))
+        stat = os.stat(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            cached = self._details.get(relative_path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        counter = VERTEX_COUNTERS.get(os.path.splitext(path)[1].lower())
+        try:
+            vertex_count = counter(path) if counter else None
+        except (OSError, ValueError, KeyError, IndexError, TypeError, struct.error):
+            vertex_count = None
+
+        details = {
+            "name": relative_path,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "vertex_count": vertex_count,
+            "thumbnail": self._thumbnail(relative_path),
+        }
+        with self._lock:
+            self._details[relative_path] = (version, details)
+        return details
+
+    def _thumbnail(self, relative_path):
+        """An image next to the model with the same stem (or the stem plus _enhanced)."""
+        stem = os.path.splitext(relative_path)[0]
+        for candidate in (stem, f"{stem}_enhanced"):
+            for ext in THUMBNAIL_EXTENSIONS:
+                if os.path.isfile(os.path.join(self.root, *f"{candidate}{ext}".split("/"))):
+                    return f"{candidate}{ext}"
+        return None
+
+
+_model_indexes = {}
+_model_indexes_lock = threading.Lock()
+
+
+def get_model_index(root):
+    """Return the shared ModelIndex of root."""
+    with _model_indexes_lock:
+        index = _model_indexes.get(root)
+        if index is None:
+            index = ModelIndex(root)
+            _model_indexes[root] = index
+    return index
+
+
+def get_preview_index():
+    return get_model_index(os.path.join(folder_paths.get_input_directory(), "3d"))
+
+
+if MODEL_ROUTE_ENABLED:
+    @PromptServer.instance.routes.get("/bespokeai/model-index")
+    async def get_bespokeai_model_index(request):
+        index = get_preview_index()
+        files = await asyncio.get_running_loop().run_in_executor(None, index.files)
+        if request.query.get("details") in ("1", "true"):
+            def collect():
+                models = []
+                for name in files:
+                    try:
+                        models.append(index.details(name))
+                    except OSError:
+                        continue
+                return models
+
+            models = await asyncio.get_running_loop().run_in_executor(None, collect)
+        else:
+            models = [{"name": name} for name in files]
+        return web.json_response({"root": "input/3d", "models": models})
+
+
+class _ItemProgress:
+    """Progress sink for one image of a batch, mimicking ProgressBar.update_absolute."""
+
+    def __init__(self, slots, index):
+        self.slots = slots
+        self.index = index
+
+    def update_absolute(self, value, total=None, preview=None):
+        self.slots[self.index] = value
+
+
+class BespokeAI3DGeneration:
+    """
+    Generate 3D models from images using BespokeAI API.
+    Supports AI enhancement, PBR textures, low-poly mode, and part segmentation.
+    Output mesh_path can be connected to ComfyUI's built-in Preview3D node (model_file input).
+    """
+
+    API_URL = API_URL
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "image": ("IMAGE",),
+                "api_key": ("STRING", {
+                    "default": "",
+                    "multiline": False,
+                    "placeholder": "bspk_your_api_key_here"
+                }),
+                "resolution": (["500k", "1m", "1.5m"], {"default": "1m"}),
+                "with_texture": ("BOOLEAN", {"default": True}),
+                "ai_enhancement": ("BOOLEAN", {"default": True}),
+            },
+            "optional": {
+                "low_poly": ("BOOLEAN", {"default": False}),
+                "segmentation": ("BOOLEAN", {"default": False}),
+                "prompt": ("STRING", {
+                    "default": "",
+                    "multiline": True,
+                    "placeholder": "Optional: Custom prompt for AI enhancement"
+                }),
+                "poll_interval": ("FLOAT", {"default": 5.0, "min": 2.0, "max": 30.0, "step": 1.0}),
+                "max_poll_attempts": ("INT", {"default": 120, "min": 10, "max": 600}),
+                "batch_mode": ("BOOLEAN", {"default": False}),
+                "use_cache": ("BOOLEAN", {"default": True}),
+                "image_format": (IMAGE_FORMATS, {"default": "png"}),
+                "png_compress_level": ("INT", {"default": 6, "min": 0, "max": 9}),
+                "max_edge": ("INT", {"default": 0, "min": 0, "max": 8192, "step": 64}),
+                "download_all": ("BOOLEAN", {"default": False}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("mesh_path", "model_url", "enhanced_image_url", "obj_path", "result_files")
+    OUTPUT_IS_LIST = (True, True, True, True, True)
+    FUNCTION = "generate_3d_async" if ASYNC_NODES_SUPPORTED else "generate_3d"
+    CATEGORY = "BespokeAI/3D"
+    OUTPUT_NODE = True
+
+    def __init__(self):
+        self.pipeline = GenerationPipeline(self.API_URL)
+
+    def generate_3d(self, image, api_key, resolution, with_texture, ai_enhancement, batch_mode=False, **options):
+        """Main generation function. options holds the optional node inputs."""
+        pbar, jobs = self._jobs(image, batch_mode, dict(
+            options, api_key=api_key, resolution=resolution, with_texture=with_texture, ai_enhancement=ai_enhancement))
+        return self.pipeline.outputs(self.pipeline.map(self.pipeline.run, jobs, pbar), pbar)
+
+    async def generate_3d_async(self, image, api_key, resolution, with_texture, ai_enhancement, batch_mode=False,
+                                **options):
+        """Asynchronous variant of generate_3d, used when ComfyUI supports async nodes."""
+        pbar, jobs = self._jobs(image, batch_mode, dict(
+            options, api_key=api_key, resolution=resolution, with_texture=with_texture, ai_enhancement=ai_enhancement))
+        return self.pipeline.outputs(await self.pipeline.map_async(self.pipeline.run_async, jobs, pbar), pbar)
+
+    def _jobs(self, image, batch_mode, options):
+        """Validate inputs and create one job per image. Returns (pbar, jobs)."""
+        pbar, options = self.pipeline.start(options)
+
+        # Split the batch: every image becomes its own generation task
+        sources = ImageInput.from_batch(image, batch_mode)
+        if len(sources) > 1:
+            print(f"[BespokeAI] Batch mode: generating {len(sources)} models concurrently...")
+
+        return pbar, self.pipeline.jobs(sources, options, pbar)
 
 
 class BespokeAI3DGenerationFromURL:
@@ -268,7 +2788,7 @@ class BespokeAI3DGenerationFromURL:
     Output mesh_path can be connected to ComfyUI's built-in Preview3D node (model_file input).
     """
 
-    API_URL = "https://heovujhdxkvbkaaguzwl.supabase.co/functions/v1/public-3d-api"
+    API_URL = API_URL
 
     @classmethod
     def INPUT_TYPES(cls):
@@ -298,109 +2818,208 @@ class BespokeAI3DGenerationFromURL:
                 }),
                 "poll_interval": ("FLOAT", {"default": 5.0, "min": 2.0, "max": 30.0, "step": 1.0}),
                 "max_poll_attempts": ("INT", {"default": 120, "min": 10, "max": 600}),
+                # Off by default: the image behind a URL may change while the URL does not
+                "use_cache": ("BOOLEAN", {"default": False}),
+                "download_all": ("BOOLEAN", {"default": False}),
             }
         }
 
-    RETURN_TYPES = ("STRING", "STRING", "STRING")
-    RETURN_NAMES = ("mesh_path", "model_url", "enhanced_image_url")
-    FUNCTION = "generate_3d"
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("mesh_path", "model_url", "enhanced_image_url", "obj_path", "result_files")
+    FUNCTION = "generate_3d_async" if ASYNC_NODES_SUPPORTED else "generate_3d"
     CATEGORY = "BespokeAI/3D"
     OUTPUT_NODE = True
 
     def __init__(self):
-        self.output_dir = folder_paths.get_output_directory()
-        self.model_dir = os.path.join(self.output_dir, "bespokeai_3d")
-        os.makedirs(self.model_dir, exist_ok=True)
-
-        # Reuse methods from main class
-        self._main = BespokeAI3DGeneration()
+        self.pipeline = GenerationPipeline(self.API_URL)
 
-    def generate_3d(self, image_url, api_key, resolution, with_texture, ai_enhancement,
-                    low_poly=False, segmentation=False, prompt="",
-                    poll_interval=5.0, max_poll_attempts=120):
+    def generate_3d(self, image_url, api_key, resolution, with_texture, ai_enhancement, use_cache=False, **options):
         """Generate 3D from image URL."""
-
-        if not api_key or not api_key.strip():
-            raise ValueError("API key is required. Get yours at https://bespokeai.build")
-
+        pbar, jobs = self._jobs(image_url, use_cache, dict(
+            options, api_key=api_key, resolution=resolution, with_texture=with_texture, ai_enhancement=ai_enhancement))
+        outputs = self.pipeline.outputs(self.pipeline.map(self.pipeline.run, jobs, pbar), pbar)
+        return tuple(values[0] for values in outputs)
+
+    async def generate_3d_async(self, image_url, api_key, resolution, with_texture, ai_enhancement, use_cache=False,
+                                **options):
+        """Asynchronous variant of generate_3d, used when ComfyUI supports async nodes."""
+        pbar, jobs = self._jobs(image_url, use_cache, dict(
+            options, api_key=api_key, resolution=resolution, with_texture=with_texture, ai_enhancement=ai_enhancement))
+        outputs = self.pipeline.outputs(await self.pipeline.map_async(self.pipeline.run_async, jobs, pbar), pbar)
+        return tuple(values[0] for values in outputs)
+
+    def _jobs(self, image_url, use_cache, options):
+        """Validate inputs and create the job. Returns (pbar, jobs)."""
         if not image_url or not image_url.strip():
             raise ValueError("Image URL is required.")
 
-        api_key = api_key.strip()
-        image_url = image_url.strip()
+        pbar, options = self.pipeline.start(dict(options, use_cache=use_cache))
+        return pbar, self.pipeline.jobs([UrlInput(image_url.strip())], options, pbar)
 
-        # Create progress bar immediately when execution starts
-        pbar = comfy.utils.ProgressBar(100)
-        pbar.update_absolute(0)
-        print("[BespokeAI] Starting 3D generation...")
 
-        # Validate segmentation + resolution combo
-        if segmentation and resolution != "500k":
-            print("[BespokeAI] Warning: Segmentation only works with 500k resolution. Forcing 500k.")
-            resolution = "500k"
+class BespokeAI3DGenerationFromFile:
+    """
+    Generate 3D models from an image file on disk using BespokeAI API.
+    Relative paths are resolved against ComfyUI's input directory. The file is
+    read by the node itself, so no IMAGE tensor is materialised in the graph.
+    Output mesh_path can be connected to ComfyUI's built-in Preview3D node (model_file input).
+    """
 
-        # Submit generation request with URL directly (0-10%)
-        print("[BespokeAI] Submitting 3D generation request...")
-        pbar.update_absolute(5)
-        submit_response = self._main.submit_generation(
-            api_key=api_key,
-            image_data=image_url,  # API accepts URLs directly
-            resolution=resolution,
-            with_texture=with_texture,
-            ai_enhancement=ai_enhancement,
-            low_poly=low_poly,
-            segmentation=segmentation,
-            prompt=prompt
-        )
-        pbar.update_absolute(10)
+    API_URL = API_URL
 
-        task_id = submit_response.get("taskId")
-        credits_used = submit_response.get("creditsUsed", 0)
-        enhanced_image_url = submit_response.get("enhancedImageUrl", "")
+    @classmethod
+    def INPUT_TYPES(cls):
+        inputs = BespokeAI3DGeneration.INPUT_TYPES()
+        del inputs["required"]["image"]
+        del inputs["optional"]["batch_mode"]
+        inputs["required"] = {
+            "image_path": ("STRING", {
+                "default": "",
+                "multiline": False,
+                "placeholder": "example.png or /path/to/image.png"
+            }),
+            **inputs["required"],
+        }
+        return inputs
 
-        print(f"[BespokeAI] Task submitted: {task_id} (Credits used: {credits_used})")
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("mesh_path", "model_url", "enhanced_image_url", "obj_path", "result_files")
+    FUNCTION = "generate_3d_async" if ASYNC_NODES_SUPPORTED else "generate_3d"
+    CATEGORY = "BespokeAI/3D"
+    OUTPUT_NODE = True
 
-        # Poll for completion (10-90%)
-        print("[BespokeAI] Generating 3D model (this may take a few minutes)...")
-        result = self._main.poll_task(
-            api_key=api_key,
-            task_id=task_id,
-            segmentation=segmentation,
-            poll_interval=poll_interval,
-            max_attempts=max_poll_attempts,
-            pbar=pbar
-        )
+    def __init__(self):
+        self.pipeline = GenerationPipeline(self.API_URL)
 
-        # Extract file URLs (90%)
-        pbar.update_absolute(90)
-        model_url = result.get("modelUrl", "")
-        result_files = result.get("resultFiles", [])
+    def generate_3d(self, image_path, api_key, resolution, with_texture, ai_enhancement, **options):
+        """Generate 3D from an image file."""
+        pbar, jobs = self._jobs(image_path, dict(
+            options, api_key=api_key, resolution=resolution, with_texture=with_texture, ai_enhancement=ai_enhancement))
+        outputs = self.pipeline.outputs(self.pipeline.map(self.pipeline.run, jobs, pbar), pbar)
+        return tuple(values[0] for values in outputs)
 
-        glb_url = ""
+    async def generate_3d_async(self, image_path, api_key, resolution, with_texture, ai_enhancement, **options):
+        """Asynchronous variant of generate_3d, used when ComfyUI supports async nodes."""
+        pbar, jobs = self._jobs(image_path, dict(
+            options, api_key=api_key, resolution=resolution, with_texture=with_texture, ai_enhancement=ai_enhancement))
+        outputs = self.pipeline.outputs(await self.pipeline.map_async(self.pipeline.run_async, jobs, pbar), pbar)
+        return tuple(values[0] for values in outputs)
 
-        for file_info in result_files:
-            file_type = file_info.get("Type", "").lower()
-            if file_type == "glb":
-                glb_url = file_info.get("Url", "")
-                break
+    def _jobs(self, image_path, options):
+        """Validate inputs and create the job. Returns (pbar, jobs)."""
+        if not image_path or not image_path.strip():
+            raise ValueError("Image path is required.")
 
-        if not glb_url and model_url:
-            glb_url = model_url
+        pbar, options = self.pipeline.start(options)
+        return pbar, self.pipeline.jobs([FileInput(image_path.strip())], options, pbar)
 
-        # Download GLB file (90-100%)
-        timestamp = int(time.time())
-        mesh_path = ""
 
-        if glb_url:
-            print("[BespokeAI] Downloading GLB file...")
-            pbar.update_absolute(95)
-            mesh_path = self._main.download_file(glb_url, f"model_{timestamp}.glb")
-            print(f"[BespokeAI] GLB saved: {mesh_path}")
+class BespokeAI3DSubmit:
+    """
+    Submit 3D generations without waiting for them.
+    Returns one task handle per image right away; connect the handles to
+    BespokeAI 3D Await to collect the models later in the graph. Polling starts
+    at submission, so generation overlaps with whatever runs in between.
+    Submissions over the in-flight or submit rate limits are queued in the
+    background (their task_id is empty) and Await waits for them.
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return BespokeAI3DGeneration.INPUT_TYPES()
 
+    RETURN_TYPES = ("BESPOKEAI_TASK", "STRING")
+    RETURN_NAMES = ("task", "task_id")
+    OUTPUT_IS_LIST = (True, True)
+    FUNCTION = "submit_async" if ASYNC_NODES_SUPPORTED else "submit"
+    CATEGORY = "BespokeAI/3D"
+
+    def __init__(self):
+        self.pipeline = GenerationPipeline(BespokeAI3DGeneration.API_URL)
+
+    def submit(self, image, api_key, resolution, with_texture, ai_enhancement, batch_mode=False, **options):
+        """Submit every image and return task handles without waiting for completion."""
+        pbar, jobs = self._jobs(image, batch_mode, dict(
+            options, api_key=api_key, resolution=resolution, with_texture=with_texture, ai_enhancement=ai_enhancement))
+        return self._handles(self.pipeline.map(self._submit_one, jobs, pbar, name="submit"), pbar)
+
+    async def submit_async(self, image, api_key, resolution, with_texture, ai_enhancement, batch_mode=False,
+                           **options):
+        """Asynchronous variant of submit, used when ComfyUI supports async nodes."""
+        pbar, jobs = self._jobs(image, batch_mode, dict(
+            options, api_key=api_key, resolution=resolution, with_texture=with_texture, ai_enhancement=ai_enhancement))
+        return self._handles(await self.pipeline.map_async(self._submit_one_async, jobs, pbar), pbar)
+
+    def _jobs(self, image, batch_mode, options):
+        pbar, options = self.pipeline.start(options)
+        return pbar, self.pipeline.jobs(ImageInput.from_batch(image, batch_mode), options, pbar)
+
+    @staticmethod
+    def _handles(handles, pbar):
         pbar.update_absolute(100)
-        print("[BespokeAI] 3D generation complete!")
+        print(f"[BespokeAI] Submitted {len(handles)} task(s), collect them with BespokeAI 3D Await")
+
+        return (handles, [handle.task_id for handle in handles])
+
+    def _submit_one(self, job):
+        """
+        Submit one job (or resolve it from the cache); polling starts right away.
+        Without a free in-flight slot and submit token, the submit is queued instead.
+        """
+        if self.pipeline.prepare(job):
+            return job
+
+        if get_api_limiter().try_reserve():
+            job.reserved = True
+            self.pipeline.submit(job)
+        else:
+            self.pipeline.submit_later(job)
+        return job
+
+    async def _submit_one_async(self, job):
+        # Never waits for the limiter, so the default executor is fine
+        return await asyncio.to_thread(self._submit_one, job)
+
+
+class BespokeAI3DAwait:
+    """
+    Wait for tasks from BespokeAI 3D Submit and download their models.
+    Accepts a single handle or a list of handles; outputs are lists in the same order.
+    Output mesh_path can be connected to ComfyUI's built-in Preview3D node (model_file input).
+    """
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                "task": ("BESPOKEAI_TASK",),
+            }
+        }
+
+    INPUT_IS_LIST = True
+    RETURN_TYPES = ("STRING", "STRING", "STRING", "STRING", "STRING")
+    RETURN_NAMES = ("mesh_path", "model_url", "enhanced_image_url", "obj_path", "result_files")
+    OUTPUT_IS_LIST = (True, True, True, True, True)
+    FUNCTION = "await_tasks_async" if ASYNC_NODES_SUPPORTED else "await_tasks"
+    CATEGORY = "BespokeAI/3D"
+    OUTPUT_NODE = True
+
+    def __init__(self):
+        self.pipeline = GenerationPipeline(BespokeAI3DGeneration.API_URL)
+
+    def await_tasks(self, task):
+        """Wait for every task handle and download the results."""
+        pbar = comfy.utils.ProgressBar(100)
+        print(f"[BespokeAI] Waiting for {len(task)} task(s)...")
+
+        return self.pipeline.outputs(self.pipeline.map(self.pipeline.finish, task, pbar, name="await"), pbar)
 
-        return (mesh_path, model_url, enhanced_image_url)
+    async def await_tasks_async(self, task):
+        """Asynchronous variant of await_tasks, used when ComfyUI supports async nodes."""
+        pbar = comfy.utils.ProgressBar(100)
+        print(f"[BespokeAI] Waiting for {len(task)} task(s)...")
+
+        return self.pipeline.outputs(await self.pipeline.map_async(self.pipeline.finish_async, task, pbar), pbar)
 
 
 class BespokeAI3DPreview:
@@ -411,18 +3030,8 @@ class BespokeAI3DPreview:
 
     @classmethod
     def INPUT_TYPES(cls):
-        # Use input/3d folder for model files
-        input_dir = os.path.join(folder_paths.get_input_directory(), "3d")
-        os.makedirs(input_dir, exist_ok=True)
-
-        # Collect all 3D files for the dropdown
-        files = []
-        if os.path.exists(input_dir):
-            for f in os.listdir(input_dir):
-                if f.lower().endswith(('.glb', '.gltf', '.obj', '.fbx', '.stl')):
-                    files.append(f)
-
-        files = sorted(files) if files else ["None"]
+        # Model files under the input/3d folder (and its subfolders), from the cached index
+        files = get_preview_index().files() or ["None"]
 
         return {
             "required": {
@@ -447,21 +3056,40 @@ class BespokeAI3DPreview:
         final_filename = None
         subfolder = "3d"
 
-        # Priority 1: Check if a path came from the Generation Node
+        # Priority 1: Generated models are served in place from output/bespokeai_3d
+        url = served_url(glb_path) if MODEL_ROUTE_ENABLED and glb_path and os.path.isfile(glb_path) else None
+        if url is not None:
+            filename = os.path.basename(glb_path)
+            print(f"[BespokeAI] Displaying 3D model: {filename}")
+            return {
+                "ui": {
+                    "mesh": [{
+                        "filename": filename,
+                        "subfolder": "",
+                        "type": "bespokeai",
+                        "url": url
+                    }]
+                }
+            }
+
+        # Priority 2: Other model paths are placed in input/3d
         if glb_path and glb_path.strip() and os.path.exists(glb_path):
             filename = os.path.basename(glb_path)
             dest_path = os.path.join(input_3d_dir, filename)
 
-            # Copy file to input/3d so the web server can serve it
-            if not os.path.exists(dest_path) or not os.path.samefile(glb_path, dest_path):
-                shutil.copy2(glb_path, dest_path)
-                print(f"[BespokeAI] Copied generated model to input/3d: {filename}")
+            # Place the file in input/3d so the web server can serve it
+            method = place_file(glb_path, dest_path)
+            if method in ("same", "identical"):
+                print(f"[BespokeAI] Model already in input/3d: {filename}")
+            else:
+                print(f"[BespokeAI] Placed generated model in input/3d ({method}): {filename}")
 
             final_filename = filename
 
-        # Priority 2: Use the dropdown selection
+        # Priority 3: Use the dropdown selection
         elif model_file and model_file != "None":
-            final_filename = model_file
+            folder, final_filename = posixpath.split(model_file)
+            subfolder = posixpath.join(subfolder, folder) if folder else subfolder
 
         if not final_filename:
             print("[BespokeAI] No model to preview.")
@@ -483,21 +3111,35 @@ class BespokeAI3DPreview:
 
     @classmethod
     def IS_CHANGED(cls, model_file, glb_path=""):
-        # Always re-execute to pick up new files
+        # Re-execute when the content of the previewed file changes, not its path
         if glb_path and glb_path.strip():
-            return glb_path
-        return model_file
+            path = glb_path
+        elif model_file and model_file != "None":
+            path = os.path.join(folder_paths.get_input_directory(), "3d", *model_file.split("/"))
+        else:
+            return model_file
+
+        try:
+            return file_fingerprint(path)
+        except OSError:
+            return path
 
 
 # Node mappings for ComfyUI
 NODE_CLASS_MAPPINGS = {
     "BespokeAI3DGeneration": BespokeAI3DGeneration,
     "BespokeAI3DGenerationFromURL": BespokeAI3DGenerationFromURL,
+    "BespokeAI3DGenerationFromFile": BespokeAI3DGenerationFromFile,
+    "BespokeAI3DSubmit": BespokeAI3DSubmit,
+    "BespokeAI3DAwait": BespokeAI3DAwait,
     "BespokeAI3DPreview": BespokeAI3DPreview,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "BespokeAI3DGeneration": "BespokeAI 3D Generation",
     "BespokeAI3DGenerationFromURL": "BespokeAI 3D Generation (URL)",
+    "BespokeAI3DGenerationFromFile": "BespokeAI 3D Generation (File)",
+    "BespokeAI3DSubmit": "BespokeAI 3D Submit",
+    "BespokeAI3DAwait": "BespokeAI 3D Await",
     "BespokeAI3DPreview": "BespokeAI 3D Preview",
 }
@@ -312,13 +312,17 @@ app.registerExtension({
             }
 
             // Construct the URL for the model
-            // ComfyUI serves files from input directory via /view endpoint
+            // Generated models come with a URL on the BespokeAI model route, which
+            // streams them from output/bespokeai_3d with Range and ETag support.
+            // Other files are served from the input directory via /view endpoint
             const subfolder = mesh.subfolder || "";
             const filename = mesh.filename;
             const type = mesh.type || "input";
 
             let modelUrl;
-            if (type === "input") {
+            if (mesh.url) {
+                modelUrl = api.apiURL(mesh.url);
+            } else if (type === "input") {
                 modelUrl = api.apiURL(`/view?filename=${encodeURIComponent(filename)}&subfolder=${encodeURIComponent(subfolder)}&type=${type}`);
             } else {
                 modelUrl = api.apiURL(`/view?filename=${encodeURIComponent(filename)}&type=${type}`);